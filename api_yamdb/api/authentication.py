@@ -0,0 +1,142 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .cache import get_cache
+
+STAMP_KEY = 'api-auth:{}:stamp'
+STAMP_CLAIM = 'stamp'
+# Поля пользователя, которые токен несёт в себе.
+CLAIMS = ('username', 'role', 'is_superuser')
+# Изменение этих полей отзывает выданные пользователю токены.
+REVOKING_FIELDS = (*CLAIMS, 'is_active')
+
+# id пользователя -> (до какого момента верить записи, отметка).
+_stamps = {}
+
+
+def get_config():
+    return {
+        'USER_TTL': 30,
+        'MAX_USERS': 10000,
+        **getattr(settings, 'API_AUTH', {}),
+    }
+
+
+def get_stamp(user_id):
+    """Отметка последнего отзыва токенов пользователя.
+
+    Источник правды это User.token_stamp. Общий кэш избавляет от запроса
+    к базе, а процесс помнит отметку USER_TTL секунд: в остальных
+    процессах отзыв вступает в силу с такой задержкой. Если кэш потерял
+    отметку, она снова читается из базы; у удалённого пользователя её
+    нет, и вернётся None.
+    """
+    now = time.monotonic()
+    entry = _stamps.get(user_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    config = get_config()
+    if len(_stamps) >= config['MAX_USERS']:
+        _stamps.clear()
+    cache = get_cache()
+    key = STAMP_KEY.format(user_id)
+    stamp = cache.get(key)
+    if stamp is None:
+        stamp = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).values_list('token_stamp', flat=True).first()
+        if stamp is not None:
+            cache.add(key, stamp, None)
+    _stamps[user_id] = (now + config['USER_TTL'], stamp)
+    return stamp
+
+
+def revoke_tokens(user_id):
+    """Новая отметка пользователя в базе и в кэше, возвращает её."""
+    stamp = time.time_ns()
+    get_user_model().objects.filter(
+        **{api_settings.USER_ID_FIELD: user_id}
+    ).update(token_stamp=stamp)
+    get_cache().set(STAMP_KEY.format(user_id), stamp, None)
+    _stamps[user_id] = (time.monotonic() + get_config()['USER_TTL'], stamp)
+    return stamp
+
+
+def forget_stamp(user_id):
+    """Для удалённого пользователя: отметку больше не найти и в базе."""
+    get_cache().delete(STAMP_KEY.format(user_id))
+    _stamps.pop(user_id, None)
+
+
+def clear_stamps():
+    _stamps.clear()
+
+
+def add_claims(token, user):
+    for claim in CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[STAMP_CLAIM] = user.token_stamp
+    # add, а не set: при параллельном отзыве в кэше уже более новая
+    # отметка, и затирать её нельзя.
+    get_cache().add(
+        STAMP_KEY.format(getattr(user, api_settings.USER_ID_FIELD)),
+        user.token_stamp, None,
+    )
+    return token
+
+
+def get_access_token(user):
+    return add_claims(AccessToken.for_user(user), user)
+
+
+def get_refresh_token(user):
+    """Refresh-токен с теми же claims: access из него выдаётся без базы."""
+    return add_claims(RefreshToken.for_user(user), user)
+
+
+def check_stamp(token):
+    try:
+        user_id = token[api_settings.USER_ID_CLAIM]
+        stamp = token[STAMP_CLAIM]
+    except KeyError:
+        raise InvalidToken('Токен выдан без нужных claims')
+    # У каждого выданного токена отметка есть; None у старых токенов
+    # или у удалённого пользователя совпадать не должен.
+    if stamp is None or get_stamp(user_id) != stamp:
+        raise InvalidToken('Права пользователя изменились, '
+                           'получите новый токен')
+    return user_id
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без запроса пользователя из базы.
+
+    Роль, имя и is_superuser берутся из подписанного токена, выданного
+    get_access_token. Смена этих полей или деактивация пользователя
+    меняет его отметку, и токены со старой отметкой отклоняются.
+    Остальные поля пользователя отложены и читаются из базы при
+    обращении. Токены без нужных claims проверяются по базе, как раньше.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token
+               for claim in (*CLAIMS, STAMP_CLAIM)):
+            return super().get_user(validated_token)
+        user_id = check_stamp(validated_token)
+        values = {
+            api_settings.USER_ID_FIELD: user_id,
+            'is_active': True,
+            **{claim: validated_token[claim] for claim in CLAIMS},
+        }
+        model = get_user_model()
+        names = [field.attname for field in model._meta.concrete_fields
+                 if field.attname in values]
+        return model.from_db(DEFAULT_DB_ALIAS, names,
+                             [values[name] for name in names])
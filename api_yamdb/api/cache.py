@@ -0,0 +1,164 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'api-cache:{}:version'
+MODIFIED_KEY = 'api-cache:{}:modified'
+STATS_KEY = 'api-cache:{}:{}'
+RESPONSE_KEY = 'api-cache:{}:{}:{}'
+
+
+def get_config():
+    return {
+        'ALIAS': 'default',
+        'TIMEOUT': 60,
+        'TIMEOUTS': {},
+        'STATS': False,
+        **getattr(settings, 'API_CACHE', {}),
+    }
+
+
+def get_cache():
+    return caches[get_config()['ALIAS']]
+
+
+def get_version(resource):
+    """Текущая версия ресурса, часть ключа всех его ответов.
+
+    Начальное значение берётся от времени, а не с единицы: если счётчик
+    вытеснят из кэша, новые ключи не совпадут со старыми записями.
+    """
+    cache = get_cache()
+    key = VERSION_KEY.format(resource)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        return cache.get(key)
+    return version
+
+
+def bump_version(*resources):
+    """Новая версия и время изменения ресурсов.
+
+    Last-Modified считается в секундах, поэтому время изменения всегда
+    растёт: после второй записи в ту же секунду клиент с
+    If-Modified-Since иначе получил бы 304 со старыми данными.
+    """
+    cache = get_cache()
+    now = int(time.time())
+    for resource in resources:
+        try:
+            cache.incr(VERSION_KEY.format(resource))
+        except ValueError:
+            cache.set(VERSION_KEY.format(resource), time.time_ns(), None)
+        key = MODIFIED_KEY.format(resource)
+        cache.set(key, max(now, cache.get(key, 0) + 1), None)
+
+
+def get_modified(resource):
+    """Время последнего изменения ресурса в секундах.
+
+    Если отметки нет в кэше, считаем ресурс изменённым сейчас: клиент
+    лишний раз получит полный ответ, но не устаревший.
+    """
+    cache = get_cache()
+    key = MODIFIED_KEY.format(resource)
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, int(time.time()), None)
+        return cache.get(key)
+    return modified
+
+
+def count(resource, outcome):
+    if not get_config()['STATS']:
+        return
+    cache = get_cache()
+    key = STATS_KEY.format(resource, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_stats(resource):
+    cache = get_cache()
+    return {
+        outcome: cache.get(STATS_KEY.format(resource, outcome), 0)
+        for outcome in ('hit', 'miss')
+    }
+
+
+def get_request_digest(request, *extra):
+    query = sorted(
+        (name, value) for name, values in request.query_params.lists()
+        for value in values
+    )
+    # В ответах пагинации есть абсолютные ссылки, поэтому хост в ключе.
+    return hashlib.md5(
+        repr((request.get_host(), request.path, query, *extra)).encode()
+    ).hexdigest()
+
+
+def get_response_key(request, resource):
+    return RESPONSE_KEY.format(
+        resource, get_version(resource), get_request_digest(request)
+    )
+
+
+def cached_response(view, handler, request, *args, **kwargs):
+    """Отдаёт данные ответа из кэша или кладёт их туда после handler.
+
+    Кэшируются только успешные ответы анонимным пользователям; в кэше
+    лежат данные до рендеринга, поэтому формат ответа выбирается как
+    обычно.
+    """
+    resource = view.cache_resource
+    if request.user.is_authenticated:
+        return handler(request, *args, **kwargs)
+    cache = get_cache()
+    key = get_response_key(request, resource)
+    data = cache.get(key)
+    if data is not None:
+        count(resource, 'hit')
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+    count(resource, 'miss')
+    response = handler(request, *args, **kwargs)
+    if response.status_code == status.HTTP_200_OK:
+        config = get_config()
+        cache.set(key, response.data,
+                  config['TIMEOUTS'].get(resource, config['TIMEOUT']))
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def conditional_response(view, handler, request, *args, **kwargs):
+    """Отвечает 304 по If-None-Match/If-Modified-Since до сериализации.
+
+    ETag строится из версии ресурса, адреса и формата ответа, а
+    Last-Modified из времени последнего изменения ресурса, так что
+    проверка не обращается к базе.
+    """
+    resource = view.cache_resource
+    etag = quote_etag(get_request_digest(
+        request, get_version(resource), request.accepted_media_type
+    ))
+    last_modified = get_modified(resource)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = handler(request, *args, **kwargs)
+    if response.status_code in (status.HTTP_200_OK,
+                                status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -1,15 +1,81 @@
 import django_filters
-from reviews.models import Title
+from django.db.models import Count, F
+from reviews.models import Category, Genre, Title, TitleGenre
+
+GENRE_MODES = (
+    ('any', 'Хотя бы один из жанров'),
+    ('all', 'Все жанры сразу'),
+)
+ORDERINGS = (
+    ('-rating', 'Сначала высокий рейтинг'),
+    ('rating', 'Сначала низкий рейтинг'),
+)
+
+
+def split_slugs(value):
+    return sorted({slug.strip() for slug in value.split(',') if slug.strip()})
 
 
 class MyTitleFilter(django_filters.FilterSet):
-    genre = django_filters.CharFilter(field_name='genre__slug',
-                                      lookup_expr='contains')
-    category = django_filters.CharFilter(field_name='category__slug',
-                                         lookup_expr='contains')
+    """Фильтры произведений.
+
+    genre и category принимают один slug или несколько через запятую и
+    сравнивают их точно: slug превращается в id подзапросом по
+    уникальному индексу, а произведения отбираются по индексу TitleGenre
+    без JOIN, поэтому дублей в выдаче нет. Поиск по подстроке остался в
+    genre__contains и category__contains.
+
+    ordering=-rating читается индексом title_rating_idx, произведения без
+    рейтинга идут последними. С ?cursor= порядок всегда по id.
+    """
+    genre = django_filters.CharFilter(method='filter_genre')
+    genre_mode = django_filters.ChoiceFilter(
+        choices=GENRE_MODES, method='filter_genre_mode'
+    )
+    genre__contains = django_filters.CharFilter(
+        field_name='genre__slug', lookup_expr='contains', distinct=True
+    )
+    category = django_filters.CharFilter(method='filter_category')
+    category__contains = django_filters.CharFilter(
+        field_name='category__slug', lookup_expr='contains'
+    )
     name = django_filters.CharFilter(field_name='name')
     year = django_filters.NumberFilter(field_name='year')
+    search = django_filters.CharFilter(method='filter_search')
+    # После search, чтобы заменить порядок по релевантности.
+    ordering = django_filters.ChoiceFilter(
+        choices=ORDERINGS, method='filter_ordering'
+    )
 
     class Meta:
         model = Title
-        fields = ('name', 'year', 'category', 'genre')
+        fields = ('name', 'year', 'category', 'genre', 'search', 'ordering')
+
+    def filter_genre(self, queryset, name, value):
+        slugs = split_slugs(value)
+        title_ids = TitleGenre.objects.filter(
+            genre_id__in=Genre.objects.filter(slug__in=slugs).values('id')
+        ).order_by().values('title_id')
+        if self.form.cleaned_data.get('genre_mode') == 'all':
+            title_ids = title_ids.annotate(
+                genres=Count('genre_id', distinct=True)
+            ).filter(genres=len(slugs)).values('title_id')
+        return queryset.filter(id__in=title_ids)
+
+    def filter_genre_mode(self, queryset, name, value):
+        # Режим читается в filter_genre.
+        return queryset
+
+    def filter_category(self, queryset, name, value):
+        return queryset.filter(category_id__in=Category.objects.filter(
+            slug__in=split_slugs(value)
+        ).values('id'))
+
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
+
+    def filter_ordering(self, queryset, name, value):
+        rating = F('rating')
+        rating = (rating.desc(nulls_last=True) if value.startswith('-')
+                  else rating.asc(nulls_last=True))
+        return queryset.order_by(rating, 'id')
@@ -0,0 +1,97 @@
+import io
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from api.renderers import FastJSONParser, FastJSONRenderer, orjson
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+
+def get_titles_page(size):
+    """Страница /titles/ в форме TitleSafeSerializer."""
+    return {
+        'count': size * 10,
+        'next': 'http://testserver/api/v1/titles/?limit=100&offset=100',
+        'previous': None,
+        'results': [{
+            'id': number,
+            'category': {'name': 'Фильм', 'slug': 'films'},
+            'genre': [{'name': f'Жанр {genre}', 'slug': f'genre-{genre}'}
+                      for genre in range(number % 3 + 1)],
+            'rating': number % 11 or None,
+            'year': 1950 + number % 70,
+            'name': f'Произведение номер {number}',
+            'description': 'Описание произведения ' * 5,
+        } for number in range(size)],
+    }
+
+
+def get_reviews_page(size):
+    """Страница /reviews/ в форме ReviewSerializer, pub_date как datetime."""
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    return {
+        'next': 'http://testserver/api/v1/titles/1/reviews/?cursor=cD0y',
+        'previous': None,
+        'results': [{
+            'id': number,
+            'text': 'Текст отзыва, довольно длинный. ' * 10,
+            'author': f'user{number}',
+            'score': number % 10 + 1,
+            'pub_date': start + timedelta(minutes=number, microseconds=7),
+        } for number in range(size)],
+    }
+
+
+class Command(BaseCommand):
+    """Сравнение JSONRenderer/JSONParser DRF с FastJSONRenderer/Parser.
+    Запуск командой: python manage.py bench_json [--size 100]
+
+    Для страниц /titles/ и /reviews/ печатает время одного рендера и
+    разбора в микросекундах и проверяет, что байты ответа совпадают.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=100,
+            help='Объектов на странице.',
+        )
+        parser.add_argument(
+            '--number', type=int, default=200,
+            help='Повторов в каждом замере.',
+        )
+
+    def handle(self, *args, **options):
+        if options['size'] < 1 or options['number'] < 1:
+            raise CommandError('--size и --number должны быть больше нуля')
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson не установлен, сравниваются одинаковые классы'
+            ))
+        number = options['number']
+        for name, data in (
+            ('titles', get_titles_page(options['size'])),
+            ('reviews', get_reviews_page(options['size'])),
+        ):
+            content = JSONRenderer().render(data)
+            if FastJSONRenderer().render(data) != content:
+                raise CommandError(f'{name}: ответы рендереров различаются')
+            self.report(f'{name} render', number, *[
+                lambda renderer=renderer: renderer.render(data)
+                for renderer in (JSONRenderer(), FastJSONRenderer())
+            ])
+            self.report(f'{name} parse', number, *[
+                lambda parser=parser: parser.parse(io.BytesIO(content))
+                for parser in (JSONParser(), FastJSONParser())
+            ])
+
+    def report(self, name, number, default, fast):
+        default_time, fast_time = (
+            min(timeit.repeat(function, number=number, repeat=3)) / number
+            for function in (default, fast)
+        )
+        self.stdout.write(
+            f'{name}: drf {default_time * 1e6:.0f} мкс, '
+            f'fast {fast_time * 1e6:.0f} мкс, '
+            f'x{default_time / fast_time:.1f}'
+        )
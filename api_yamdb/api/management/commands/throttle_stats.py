@@ -0,0 +1,18 @@
+from api.throttling import get_config, get_rejected
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Число отказов ограничителей частоты по throttle_scope.
+    Запуск командой: python manage.py throttle_stats
+
+    Счётчики лежат в кэше API_THROTTLE и считаются с его запуска.
+    """
+
+    def handle(self, *args, **options):
+        for scope in sorted(get_config()['RATES']):
+            rejected = get_rejected(scope)
+            self.stdout.write(
+                f'{scope}: ip {rejected["ip"]}, '
+                f'username {rejected["username"]}'
+            )
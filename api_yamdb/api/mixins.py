@@ -1,4 +1,15 @@
-from rest_framework import mixins, viewsets
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.utils.functional import cached_property
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .cache import bump_version, cached_response, conditional_response
+from .signals import MODEL_RESOURCES
 
 
 class ListCreateDeleteViewSet(mixins.ListModelMixin,
@@ -6,3 +17,266 @@ class ListCreateDeleteViewSet(mixins.ListModelMixin,
                               mixins.DestroyModelMixin,
                               viewsets.GenericViewSet):
     pass
+
+
+class CreateThrottleMixin:
+    """Ограничивает частоту только создания объектов, см. api.throttling."""
+
+    def get_throttles(self):
+        if self.action != 'create':
+            return []
+        return super().get_throttles()
+
+
+class CachedListMixin:
+    """Кэширует list для анонимных запросов, см. api.cache."""
+    cache_resource = None
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(self, super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin:
+    """Кэширует retrieve для анонимных запросов, см. api.cache."""
+    cache_resource = None
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(self, super().retrieve,
+                               request, *args, **kwargs)
+
+
+class CachedReadMixin(CachedListMixin, CachedRetrieveMixin):
+    pass
+
+
+class ConditionalReadMixin:
+    """ETag и Last-Modified для list и retrieve, см. api.cache."""
+    cache_resource = None
+
+    def list(self, request, *args, **kwargs):
+        return conditional_response(self, super().list,
+                                    request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(self, super().retrieve,
+                                    request, *args, **kwargs)
+
+
+class ValuesListMixin:
+    """list через values_serializer_class, см. serializers.ValuesSerializer.
+
+    Строки values() проходят через фильтры и пагинацию так же, как
+    объекты. С ?fields= и ?expand= ответ строит обычный сериализатор.
+    """
+    values_serializer_class = None
+
+    def use_values_serializer(self):
+        if self.values_serializer_class is None:
+            return False
+        return getattr(self, 'sparse_params', (None, None)) == (None, None)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values_serializer():
+            return super().list(request, *args, **kwargs)
+        serializer_class = self.values_serializer_class
+        queryset = serializer_class.get_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page).data)
+        return Response(serializer_class(queryset).data)
+
+
+class BatchListMixin:
+    """?id__in=1,2,3 в list: объекты по списку id одним ответом.
+
+    Ответ {"results": [...], "missing": [...]} без пагинации: объекты в
+    порядке id из запроса и id, которых нет. Запросов столько же, сколько
+    у одной страницы списка, остальные параметры list тоже действуют.
+    """
+    batch_param = 'id__in'
+    batch_max_items = 200
+
+    def get_batch_ids(self):
+        value = self.request.query_params.get(self.batch_param)
+        if value is None:
+            return None
+        try:
+            ids = [int(part) for part in value.split(',') if part.strip()]
+        except ValueError:
+            ids = []
+        if not ids or min(ids) < 1:
+            raise ValidationError({self.batch_param: [
+                'Ожидаются id через запятую'
+            ]})
+        # Повторы выдаются один раз.
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > self.batch_max_items:
+            raise ValidationError({self.batch_param: [
+                f'Не больше {self.batch_max_items} id за запрос'
+            ]})
+        return ids
+
+    def list(self, request, *args, **kwargs):
+        ids = self.get_batch_ids()
+        if ids is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            pk__in=ids
+        )
+        use_values = getattr(self, 'use_values_serializer', None)
+        if use_values is not None and use_values():
+            serializer_class = self.values_serializer_class
+            found = {row['id']: row
+                     for row in serializer_class.get_queryset(queryset)}
+        else:
+            serializer_class = partial(self.get_serializer, many=True)
+            found = {instance.pk: instance for instance in queryset}
+        return Response({
+            'results': serializer_class(
+                [found[pk] for pk in ids if pk in found]
+            ).data,
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+
+class SparseFieldsMixin:
+    """?fields= и ?expand= для list и retrieve.
+
+    fields сужает ответ до перечисленных полей, expand перечисляет связи,
+    которые выводятся вложенными объектами (без него как раньше). Queryset
+    не читает лишнего: столбцы без запрошенных полей отложены, а
+    select_related и prefetch_related делаются только для нужных связей.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    # Отложены всегда, их нет ни в одном ответе.
+    deferred_fields = ()
+    # Столбцы полей сериализатора, названных не так, как поля модели.
+    field_sources = {}
+    sparse_actions = ('list', 'retrieve')
+
+    def get_names(self, param, allowed):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = names - set(allowed)
+        if unknown:
+            raise ValidationError({param: [
+                f'Неизвестные поля: {", ".join(sorted(unknown))}'
+            ]})
+        return names
+
+    @cached_property
+    def sparse_params(self):
+        """(fields, expand); None, если параметр не передан."""
+        serializer_class = self.get_serializer_class()
+        return (
+            self.get_names('fields', serializer_class().fields) or None,
+            self.get_names('expand', serializer_class.collapsed_fields),
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.sparse_actions:
+            kwargs['fields'], kwargs['expand'] = self.sparse_params
+        return super().get_serializer(*args, **kwargs)
+
+    def get_cursor_fields(self):
+        # Курсор читает позицию из объектов, эти поля откладывать нельзя.
+        paginator = getattr(self.paginator, 'cursor_class', self.paginator)
+        ordering = getattr(paginator, 'ordering', ())
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return {name.lstrip('-') for name in ordering}
+
+    def trim_queryset(self, queryset):
+        queryset = queryset.defer(*self.deferred_fields)
+        sparse = self.action in self.sparse_actions
+        fields = self.sparse_params[0] if sparse else None
+        if fields is None:
+            fields = set(self.get_serializer_class()().fields)
+        # select_related() без аргументов пошёл бы по всем связям.
+        select = [name for name in self.select_related_fields
+                  if name in fields]
+        if select:
+            queryset = queryset.select_related(*select)
+        queryset = queryset.prefetch_related(*[
+            name for name in self.prefetch_related_fields if name in fields
+        ])
+        if not sparse:
+            return queryset
+        keep = fields | self.get_cursor_fields()
+        for name in fields:
+            keep.update(self.field_sources.get(name, ()))
+        return queryset.defer(*[
+            # Внешние ключи не откладываем: по ним связанный менеджер
+            # подставляет известный объект, и каждый объект ходил бы в базу.
+            field.name for field in queryset.model._meta.concrete_fields
+            if not field.primary_key and not field.is_relation
+            and field.name not in keep
+        ])
+
+
+class BulkCreateMixin:
+    """POST .../bulk/ со списком объектов.
+
+    Вся пачка проверяется через bulk_serializer_class и вставляется одним
+    bulk_create. Ответ 201 со списком созданных объектов, если ошибок нет.
+    С ?atomic=true любая ошибка отменяет всю пачку: 400 и список ошибок по
+    элементам, как у many=True. Без него вставляются правильные элементы:
+    207 с results (объект или null) и errors (ошибки или {}) по индексам.
+    Пачкой объекты только создаются, изменяются они по одному.
+    """
+    bulk_serializer_class = None
+    bulk_max_items = 1000
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Ожидается список объектов'
+            ]})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                f'Не больше {self.bulk_max_items} объектов за запрос'
+            ]})
+        context = {
+            **self.get_serializer_context(),
+            **self.bulk_serializer_class.get_bulk_context(items),
+        }
+        serializers = [self.bulk_serializer_class(data=item, context=context)
+                       for item in items]
+        valid = [serializer.is_valid() for serializer in serializers]
+        errors = [serializer.errors for serializer in serializers]
+        atomic = request.query_params.get('atomic') in ('true', '1')
+        if atomic and not all(valid):
+            raise ValidationError(errors)
+        try:
+            with transaction.atomic():
+                created = iter(self.bulk_serializer_class.bulk_save([
+                    serializer.validated_data
+                    for serializer, is_valid in zip(serializers, valid)
+                    if is_valid
+                ]))
+        except IntegrityError:
+            # Уникальность проверена до вставки, так что это параллельная
+            # запись тех же значений.
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Пачка конфликтует с параллельной записью, повторите запрос'
+            ]})
+        if any(valid):
+            resources = MODEL_RESOURCES[self.bulk_serializer_class.Meta.model]
+            transaction.on_commit(lambda: bump_version(*resources))
+        results = [
+            self.get_serializer(next(created)).data if is_valid else None
+            for is_valid in valid
+        ]
+        if all(valid):
+            return Response(results, status=status.HTTP_201_CREATED)
+        return Response(
+            {'results': results, 'errors': errors},
+            status=status.HTTP_207_MULTI_STATUS,
+        )
@@ -1,5 +1,64 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       LimitOffsetPagination,
+                                       PageNumberPagination)
 
 
 class MyPaginator(PageNumberPagination):
     page_size = 5
+
+
+class IdCursorPagination(CursorPagination):
+    ordering = 'id'
+
+
+class PubDateCursorPagination(CursorPagination):
+    ordering = ('-pub_date', '-id')
+
+
+class CursorOrLegacyPagination(BasePagination):
+    """Курсорная пагинация по запросу ?cursor=, иначе прежний формат.
+
+    Курсор не делает COUNT(*) и OFFSET, поэтому любая страница стоит
+    столько же, сколько первая. Пустой ?cursor= открывает первую страницу.
+    """
+    legacy_class = PageNumberPagination
+    cursor_class = PubDateCursorPagination
+
+    def __init__(self):
+        self.paginator = self.legacy_class()
+
+    @property
+    def display_page_controls(self):
+        return self.paginator.display_page_controls
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_class.cursor_query_param in request.query_params:
+            self.paginator = self.cursor_class()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_schema_fields(self, view):
+        return (self.legacy_class().get_schema_fields(view)
+                + self.cursor_class().get_schema_fields(view))
+
+    def get_schema_operation_parameters(self, view):
+        return (self.legacy_class().get_schema_operation_parameters(view)
+                + self.cursor_class().get_schema_operation_parameters(view))
+
+
+class PubDateCursorOrPagePagination(CursorOrLegacyPagination):
+    legacy_class = PageNumberPagination
+    cursor_class = PubDateCursorPagination
+
+
+class IdCursorOrLimitOffsetPagination(CursorOrLegacyPagination):
+    legacy_class = LimitOffsetPagination
+    cursor_class = IdCursorPagination
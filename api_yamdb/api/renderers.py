@@ -0,0 +1,104 @@
+import json
+import re
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.json import strict_constant
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# orjson не экранирует их, а JSONRenderer экранирует всегда.
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+# Такие целые orjson.loads читает как float, а json как int.
+BIG_INT = re.compile(rb'\d{19}')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, если он установлен.
+
+    Вывод совпадает с JSONRenderer: даты и Decimal отдаются в
+    encoder_class DRF, а отступы, нестрогий JSON и всё, что orjson
+    не умеет (целые больше 64 бит, нестроковые ключи), рендерит
+    JSONRenderer. Не совпадает только запись float в экспоненциальной
+    форме и NaN, в ответах API таких чисел нет.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii
+                or not self.compact or not self.strict
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        for char, escaped in LINE_SEPARATORS:
+            if char in ret:
+                ret = ret.replace(char, escaped)
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser на orjson, если он установлен.
+
+    Тело, которое orjson не разобрал, и тело с длинными числами (целые
+    больше 64 бит orjson читает как float) разбирает json, так что
+    результат и ошибки как у JSONParser.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower() not in (
+            'utf-8', 'utf8'
+        ):
+            return super().parse(stream, media_type, parser_context)
+        data = stream.read()
+        if not BIG_INT.search(data):
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+        try:
+            return json.loads(data.decode(encoding),
+                              parse_constant=strict_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class ExportRenderer(BaseRenderer):
+    """Выбор формата выгрузки по Accept или ?format=.
+
+    Сами строки выгрузки отдаёт StreamingHttpResponse, а render нужен
+    только для ошибок, их тело остаётся в JSON.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
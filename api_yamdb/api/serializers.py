@@ -1,16 +1,51 @@
+from functools import partial
+
+from api.authentication import check_stamp
 from api.validation import validate_year
 from django.contrib.auth import get_user_model
 from django.contrib.auth.validators import ASCIIUsernameValidator
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, prefetch_related_objects
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
-from reviews.models import Category, Comment, Genre, Review, Title
+from rest_framework_simplejwt import settings as jwt_settings
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from reviews.changes import get_setting as get_changes_setting
+from reviews.changes import record as record_changes
+from reviews.leaderboard import get_setting as get_leaderboard_setting
+from reviews.models import (SCORE_FIELDS, SCORES, Category, ChangeAction,
+                            ChangeEvent, Comment, Genre, Review, Title,
+                            TitleGenre, get_score_field)
 
 User = get_user_model()
 REGEX = r"^[\w.@+-]+\Z"
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class SparseFieldsSerializerMixin:
+    """Поля fields= и раскрытие связей expand= из api.mixins.SparseFieldsMixin.
+
+    fields оставляет только перечисленные поля. Связи из collapsed_fields,
+    которых нет в expand, выводятся через slug вместо вложенных объектов.
+    None в обоих аргументах оставляет сериализатор как есть.
+    """
+    collapsed_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if expand is not None:
+            for name, field_class in self.collapsed_fields.items():
+                if name in self.fields and name not in expand:
+                    self.fields[name] = field_class()
+
+
+class ReviewSerializer(SparseFieldsSerializerMixin,
+                       serializers.ModelSerializer):
     score = serializers.IntegerField()
     author = serializers.SlugRelatedField(
         read_only=True,
@@ -22,21 +57,27 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
 
     def validate_score(self, value):
-        if value < 0 or value > 10:
+        if value < 1 or value > 10:
             raise serializers.ValidationError('Введите значение от 1 до 10')
         return value
 
-    def validate(self, data):
-        request = self.context['request']
-        author = request.user
-        title_id = self.context.get('view').kwargs.get('title_id')
-        if (
-                request.method == 'POST'
-                and Review.objects.filter(title_id=title_id,
-                                          author=author).exists()
-        ):
-            raise ValidationError('Отзыв уже оставлен')
-        return data
+    def create(self, validated_data):
+        # Повторный отзыв отсекает ограничение 'unique review' в базе,
+        # без отдельного запроса exists() перед вставкой.
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            # Другие нарушения, например удалённые параллельно произведение
+            # или автор, ошибкой клиента не являются.
+            if not Review.objects.filter(
+                author=validated_data['author'],
+                title=validated_data['title'],
+            ).exists():
+                raise
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: ['Отзыв уже оставлен']}
+            )
 
 
 class SignUpSerializer(serializers.Serializer):
@@ -60,6 +101,35 @@ class TokenSeriliazer(serializers.Serializer):
     confirmation_code = serializers.CharField()
 
 
+class TokenRefreshSerializer(serializers.Serializer):
+    """Новый access-токен по refresh без обращения к пользователю в базе.
+
+    Ротация и чёрный список включаются в SIMPLE_JWT, как у
+    rest_framework_simplejwt.
+    """
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            refresh = RefreshToken(attrs["refresh"])
+        except TokenError as error:
+            raise InvalidToken(error.args[0])
+        check_stamp(refresh)
+        data = {"token": str(refresh.access_token)}
+        if jwt_settings.api_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # Приложение token_blacklist не подключено.
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+        return data
+
+
 class UserSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(
         required=True,
@@ -89,7 +159,8 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsSerializerMixin,
+                        serializers.ModelSerializer):
     review = serializers.SlugRelatedField(
         slug_field='text',
         queryset=Review.objects.all()
@@ -116,16 +187,140 @@ class GenreSerializer(serializers.ModelSerializer):
         model = Genre
 
 
-class TitleSafeSerializer(serializers.ModelSerializer):
+class TitleSafeSerializer(SparseFieldsSerializerMixin,
+                          serializers.ModelSerializer):
     category = CategorySerializer(many=False)
     genre = GenreSerializer(many=True)
     rating = serializers.IntegerField(read_only=True, initial=0)
     year = serializers.IntegerField(validators=(validate_year,))
 
+    collapsed_fields = {
+        'category': partial(serializers.SlugRelatedField,
+                            slug_field='slug', read_only=True),
+        'genre': partial(serializers.SlugRelatedField,
+                         slug_field='slug', many=True, read_only=True),
+    }
+
+    class Meta:
+        exclude = ('score_sum', 'reviews_count', 'search_vector',
+                   'updated_at', *SCORE_FIELDS)
+        model = Title
+
+
+class TitleDetailSerializer(TitleSafeSerializer):
+    """Произведение с гистограммой оценок: {"1": отзывов с 1, ...}."""
+    scores = serializers.SerializerMethodField()
+
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'category', 'genre', 'rating', 'year', 'name',
+                  'description', 'scores')
         model = Title
 
+    def get_scores(self, title):
+        return {str(score): getattr(title, get_score_field(score))
+                for score in SCORES}
+
+
+class IncludedReviewSerializer(ReviewSerializer):
+    """Отзыв в произведении с ?include=reviews."""
+    comments_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = (*ReviewSerializer.Meta.fields, 'comments_count')
+
+
+class TitlePageSerializer(TitleDetailSerializer):
+    """Произведение с последними отзывами, см. TitleViewSet.retrieve."""
+    reviews = IncludedReviewSerializer(source='included_reviews', many=True,
+                                       read_only=True)
+
+    class Meta(TitleDetailSerializer.Meta):
+        fields = (*TitleDetailSerializer.Meta.fields, 'reviews')
+
+
+class ValuesSerializer:
+    """Только чтение списка из строк values(), без объектов моделей.
+
+    Ответ совпадает с ответом обычного сериализатора байт в байт, но не
+    тратит время на привязку полей и вложенные сериализаторы. Подключается
+    к viewset через api.mixins.ValuesListMixin.
+    """
+    values_fields = ()
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def get_queryset(cls, queryset):
+        # values() сам сбрасывает select_related и defer, но не prefetch.
+        return queryset.prefetch_related(None).values(*cls.values_fields)
+
+    def to_representation(self, row):
+        return row
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows]
+
+
+class SlugNameValuesSerializer(ValuesSerializer):
+    """Вывод как у CategorySerializer и GenreSerializer."""
+    values_fields = ('name', 'slug')
+
+
+class TitleValuesSerializer(ValuesSerializer):
+    """Вывод как у TitleSafeSerializer."""
+    values_fields = ('id', 'category__name', 'category__slug', 'rating',
+                     'year', 'name', 'description')
+
+    def __init__(self, rows):
+        super().__init__(list(rows))
+        # Жанры страницы одним запросом, в порядке prefetch_related('genre').
+        self.genres = {}
+        if not self.rows:
+            return
+        links = TitleGenre.objects.filter(
+            title_id__in=[row['id'] for row in self.rows]
+        ).order_by('genre_id').values_list(
+            'title_id', 'genre__name', 'genre__slug'
+        )
+        for title_id, name, slug in links:
+            self.genres.setdefault(title_id, []).append(
+                {'name': name, 'slug': slug}
+            )
+
+    def to_representation(self, row):
+        category = None
+        if row['category__slug'] is not None:
+            category = {'name': row['category__name'],
+                        'slug': row['category__slug']}
+        return {
+            'id': row['id'],
+            'category': category,
+            'genre': self.genres.get(row['id'], []),
+            'rating': row['rating'],
+            'year': row['year'],
+            'name': row['name'],
+            'description': row['description'],
+        }
+
+
+class ScoreStatsSerializer(serializers.Serializer):
+    """Сводка из TitleQuerySet.get_score_stats: рейтинг как у Title."""
+    titles_count = serializers.IntegerField()
+    reviews_count = serializers.IntegerField()
+    rating = serializers.SerializerMethodField()
+    scores = serializers.SerializerMethodField()
+
+    def get_rating(self, stats):
+        if not stats['reviews_count']:
+            return None
+        return stats['score_sum'] // stats['reviews_count']
+
+    def get_scores(self, stats):
+        return {str(score): stats[get_score_field(score)]
+                for score in SCORES}
+
 
 class TitleSerializer(serializers.ModelSerializer):
     category = serializers.SlugRelatedField(slug_field='slug',
@@ -136,5 +331,188 @@ class TitleSerializer(serializers.ModelSerializer):
     year = serializers.IntegerField(validators=(validate_year,))
 
     class Meta:
-        fields = '__all__'
+        exclude = ('score_sum', 'reviews_count', 'rating', 'search_vector',
+                   'updated_at', *SCORE_FIELDS)
         model = Title
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    """Параметры запроса таблицы лучших произведений."""
+    genre = serializers.SlugField(required=False)
+    category = serializers.SlugField(required=False)
+    limit = serializers.IntegerField(min_value=1, default=10)
+
+    def validate_limit(self, value):
+        max_limit = get_leaderboard_setting('MAX_LIMIT')
+        if value > max_limit:
+            raise serializers.ValidationError(
+                f'Не больше {max_limit} произведений'
+            )
+        return value
+
+    def validate(self, attrs):
+        if 'genre' in attrs and 'category' in attrs:
+            raise serializers.ValidationError(
+                'Укажите либо жанр, либо категорию'
+            )
+        return attrs
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    """Параметры запроса ленты изменений."""
+    since = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, default=100)
+
+    def validate_limit(self, value):
+        max_limit = get_changes_setting('MAX_LIMIT')
+        if value > max_limit:
+            raise serializers.ValidationError(f'Не больше {max_limit} событий')
+        return value
+
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    updated_at = serializers.DateTimeField(source='created')
+
+    class Meta:
+        fields = ('id', 'resource', 'action', 'key', 'updated_at')
+        model = ChangeEvent
+
+
+class BulkCreateSerializerMixin:
+    """Проверка и вставка пачки объектов, см. api.mixins.BulkCreateMixin.
+
+    get_bulk_context заранее одним запросом на связь собирает всё, что
+    нужно валидаторам, поэтому отдельный объект в базу не ходит;
+    bulk_save вставляет проверенные объекты через bulk_create.
+    """
+
+    @classmethod
+    def get_bulk_context(cls, items):
+        return {}
+
+    @classmethod
+    def create_objects(cls, objects):
+        """Вставка с событиями ленты изменений, которых нет у bulk_create."""
+        if connection.features.can_return_rows_from_bulk_insert:
+            cls.Meta.model.objects.bulk_create(objects)
+            record_changes(objects, ChangeAction.CREATED)
+        else:
+            # Без RETURNING у объектов не будет id.
+            for instance in objects:
+                instance.save()
+        return objects
+
+    @classmethod
+    def bulk_save(cls, items):
+        model = cls.Meta.model
+        return cls.create_objects([model(**item) for item in items])
+
+
+def get_values(items, name):
+    return {
+        str(item[name]) for item in items
+        if isinstance(item, dict) and name in item
+    }
+
+
+class SlugNameBulkSerializer(BulkCreateSerializerMixin,
+                             serializers.ModelSerializer):
+    """Пачка категорий или жанров: уникальность name и slug проверяется
+    по одному запросу на всю пачку и внутри самой пачки."""
+
+    class Meta:
+        fields = ('name', 'slug')
+        extra_kwargs = {
+            'name': {'validators': []},
+            'slug': {'validators': []},
+        }
+
+    @classmethod
+    def get_bulk_context(cls, items):
+        names = get_values(items, 'name')
+        slugs = get_values(items, 'slug')
+        taken = cls.Meta.model.objects.filter(
+            Q(name__in=names) | Q(slug__in=slugs)
+        ).values_list('name', 'slug')
+        return {
+            'taken_names': {name for name, _ in taken},
+            'taken_slugs': {slug for _, slug in taken},
+        }
+
+    def validate(self, attrs):
+        errors = {}
+        for field in ('name', 'slug'):
+            taken = self.context[f'taken_{field}s']
+            if attrs[field] in taken:
+                errors[field] = [UniqueValidator.message]
+        if errors:
+            raise serializers.ValidationError(errors)
+        # Следующие элементы пачки не должны повторить эти значения.
+        self.context['taken_names'].add(attrs['name'])
+        self.context['taken_slugs'].add(attrs['slug'])
+        return attrs
+
+
+class CategoryBulkSerializer(SlugNameBulkSerializer):
+    class Meta(SlugNameBulkSerializer.Meta):
+        model = Category
+
+
+class GenreBulkSerializer(SlugNameBulkSerializer):
+    class Meta(SlugNameBulkSerializer.Meta):
+        model = Genre
+
+
+class TitleBulkSerializer(BulkCreateSerializerMixin, TitleSerializer):
+    """Пачка произведений: slug категорий и жанров всей пачки
+    превращаются в объекты двумя запросами."""
+    category = serializers.SlugField()
+    genre = serializers.ListField(child=serializers.SlugField())
+
+    @classmethod
+    def get_bulk_context(cls, items):
+        genres = set()
+        for item in items:
+            if isinstance(item, dict) and isinstance(item.get('genre'), list):
+                genres.update(str(slug) for slug in item['genre'])
+        return {
+            'categories': Category.objects.in_bulk(
+                get_values(items, 'category'), field_name='slug'
+            ),
+            'genres': Genre.objects.in_bulk(genres, field_name='slug'),
+        }
+
+    def get_object(self, objects, slug):
+        try:
+            return objects[slug]
+        except KeyError:
+            raise serializers.ValidationError(
+                serializers.SlugRelatedField.default_error_messages[
+                    'does_not_exist'
+                ].format(slug_name='slug', value=slug)
+            )
+
+    def validate_category(self, value):
+        return self.get_object(self.context['categories'], value)
+
+    def validate_genre(self, value):
+        return list({
+            slug: self.get_object(self.context['genres'], slug)
+            for slug in value
+        }.values())
+
+    @classmethod
+    def bulk_save(cls, items):
+        titles = [
+            Title(**{name: value for name, value in item.items()
+                     if name != 'genre'})
+            for item in items
+        ]
+        cls.create_objects(titles)
+        TitleGenre.objects.bulk_create(
+            TitleGenre(title=title, genre=genre)
+            for title, item in zip(titles, items)
+            for genre in item['genre']
+        )
+        prefetch_related_objects(titles, 'genre')
+        return titles
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save)
+from django.dispatch import receiver
+from reviews.models import Category, Comment, Genre, Review, Title, TitleGenre
+
+from .authentication import REVOKING_FIELDS, forget_stamp, revoke_tokens
+from .cache import bump_version
+
+User = get_user_model()
+
+# Какие версии кэша сбрасывает запись каждой модели.
+# title_pages это произведение с ?include=reviews: в нём и отзывы
+# с авторами, и число комментариев.
+MODEL_RESOURCES = {
+    # Списки отзывов удалённого произведения должны перестать отвечать 304.
+    Title: ('titles', 'reviews', 'title_pages'),
+    TitleGenre: ('titles', 'title_pages'),
+    Category: ('categories', 'titles', 'title_pages'),
+    Genre: ('genres', 'titles', 'title_pages'),
+    # Отзыв меняет рейтинг произведения.
+    Review: ('reviews', 'titles', 'comments', 'title_pages'),
+    Comment: ('comments', 'title_pages'),
+    # Имя автора выводится в отзывах и комментариях.
+    User: ('reviews', 'comments', 'title_pages'),
+}
+RESOURCES = sorted({
+    resource for resources in MODEL_RESOURCES.values()
+    for resource in resources
+})
+
+
+def invalidate(sender, using, **kwargs):
+    if not kwargs.get('action', 'post_').startswith('post_'):
+        return
+    # До фиксации параллельный запрос прочитал бы старые строки и
+    # сохранил их под новой версией.
+    resources = MODEL_RESOURCES[sender]
+    transaction.on_commit(lambda: bump_version(*resources), using=using)
+
+
+for model in MODEL_RESOURCES:
+    post_save.connect(invalidate, sender=model)
+    # Связи удаляются каскадом от Title/Genre или через m2m_changed, а
+    # обработчик post_delete отключил бы для них быстрое удаление.
+    if model is not TitleGenre:
+        post_delete.connect(invalidate, sender=model)
+m2m_changed.connect(invalidate, sender=TitleGenre)
+
+
+def get_revoking_values(user):
+    # Отложенные поля не читаем, иначе post_init сделает лишний запрос.
+    return tuple(user.__dict__.get(name) for name in REVOKING_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_revoking_values(sender, instance, **kwargs):
+    instance._saved_revoking_values = get_revoking_values(instance)
+
+
+@receiver(post_save, sender=User)
+def revoke_changed_user_tokens(sender, instance, created, **kwargs):
+    values = get_revoking_values(instance)
+    if not created and values != instance._saved_revoking_values:
+        # Иначе следующий save() объекта вернул бы старую отметку.
+        instance.token_stamp = revoke_tokens(instance.pk)
+    instance._saved_revoking_values = values
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    forget_stamp(instance.pk)
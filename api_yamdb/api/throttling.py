@@ -0,0 +1,147 @@
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = 'api-throttle:{}:{}:{}'
+REJECTED_KEY = 'api-throttle:{}:{}:rejected'
+LOGGED_KEY = 'api-throttle:{}:{}:logged'
+DURATIONS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def get_config():
+    return {
+        'ALIAS': 'default',
+        'RATES': {},
+        # Не чаще раза в столько секунд на scope и kind отказы попадают
+        # в журнал: при переборе кодов их тысячи в минуту.
+        'LOG_INTERVAL': 60,
+        **getattr(settings, 'API_THROTTLE', {}),
+    }
+
+
+def get_cache():
+    return caches[get_config()['ALIAS']]
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60), как в rest_framework.throttling."""
+    number, period = rate.split('/')
+    return int(number), DURATIONS[period[0]]
+
+
+def get_timeout(tat, now):
+    """Запись нужна, пока корзина не наполнится, потом она не влияет."""
+    return math.ceil((tat - now) / 1000) + 1
+
+
+def get_rejected(scope):
+    cache = get_cache()
+    return {
+        kind: cache.get(REJECTED_KEY.format(scope, kind), 0)
+        for kind in ('ip', 'username')
+    }
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Корзина токенов в кэше Django (алгоритм GCRA).
+
+    Вместо списка времён запросов в кэше лежит одно число: момент в
+    миллисекундах, когда корзина снова станет полной. Запрос сдвигает его
+    атомарным incr на интервал между токенами и проходит, если момент
+    отстоит от текущего не больше чем на период. Частоты задаются в
+    API_THROTTLE['RATES'][throttle_scope вьюсета][kind], без частоты
+    запросы не ограничиваются.
+    """
+    kind = None
+    timer = time.time
+
+    def get_ident_value(self, request):
+        raise NotImplementedError
+
+    def get_rate(self, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = get_config()['RATES'].get(scope, {}).get(self.kind)
+        return scope, rate
+
+    def allow_request(self, request, view):
+        scope, rate = self.get_rate(view)
+        if rate is None:
+            return True
+        ident = self.get_ident_value(request)
+        if ident is None:
+            return True
+        number, duration = parse_rate(rate)
+        interval = duration * 1000 // number
+        burst = duration * 1000
+        now = int(self.timer() * 1000)
+        key = BUCKET_KEY.format(
+            scope, self.kind, hashlib.md5(str(ident).encode()).hexdigest()
+        )
+        cache = get_cache()
+        try:
+            tat = cache.incr(key, interval)
+        except ValueError:
+            tat = None
+        if tat is None or tat - interval < now:
+            # Корзина полная, отсчёт начинается заново. Гонка здесь может
+            # потерять чужой incr, то есть ошибиться в пользу клиента.
+            tat = now + interval
+            cache.set(key, tat, get_timeout(tat, now))
+            return True
+        if tat - now <= burst:
+            cache.touch(key, get_timeout(tat, now))
+            return True
+        cache.decr(key, interval)
+        self.wait_ms = tat - burst - now
+        self.reject(cache, scope)
+        return False
+
+    def reject(self, cache, scope):
+        key = REJECTED_KEY.format(scope, self.kind)
+        try:
+            rejected = cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+            rejected = 1
+        if cache.add(LOGGED_KEY.format(scope, self.kind), 1,
+                     get_config()['LOG_INTERVAL']):
+            logger.warning(
+                'Превышена частота запросов: %s, %s, всего отказов %s',
+                scope, self.kind, rejected,
+            )
+
+    def wait(self):
+        return self.wait_ms / 1000
+
+
+class IPThrottle(TokenBucketThrottle):
+    kind = 'ip'
+
+    def get_ident_value(self, request):
+        return self.get_ident(request)
+
+
+class UsernameThrottle(TokenBucketThrottle):
+    """Считает запросы пользователя, для входа и регистрации по username."""
+    kind = 'username'
+
+    def get_ident_value(self, request):
+        if request.user.is_authenticated:
+            return request.user.pk
+        data = request.data
+        return data.get('username') if hasattr(data, 'get') else None
+
+
+def throttle_scope(scope):
+    """throttle_scope для функции с @api_view, ставится над ним."""
+    def decorator(view):
+        view.cls.throttle_scope = scope
+        return view
+    return decorator
@@ -2,7 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                    ReviewViewSet, TitleViewSet, UserViewSet, signup, token)
+                    LeaderboardViewSet, ReviewViewSet, TitleViewSet,
+                    UserViewSet, changes, signup, token, token_refresh)
 
 router = DefaultRouter()
 router.register("users", UserViewSet, basename="users")
@@ -16,6 +17,9 @@ router.register(
 router.register(
     'titles', TitleViewSet, basename='titles'
 )
+router.register(
+    'leaderboard', LeaderboardViewSet, basename='leaderboard'
+)
 router.register(
     r'titles/(?P<title_id>\d+)/reviews/(?P<review_id>\d+)/comments',
     CommentViewSet, basename='comments'
@@ -24,9 +28,11 @@ router.register(
 authurls = [
     path("signup/", signup, name="signup"),
     path("token/", token, name="token"),
+    path("token/refresh/", token_refresh, name="token_refresh"),
 ]
 
 urlpatterns = [
+    path("v1/changes/", changes, name="changes"),
     path("v1/", include(router.urls)),
     path("v1/auth/", include(authurls)),
 ]
@@ -1,24 +1,47 @@
+from api.authentication import get_refresh_token
 from api.filters import MyTitleFilter
-from api.mixins import ListCreateDeleteViewSet
-from api.pagination import MyPaginator
+from api.mixins import (BatchListMixin, BulkCreateMixin, CachedListMixin,
+                        CachedReadMixin, ConditionalReadMixin,
+                        CreateThrottleMixin, ListCreateDeleteViewSet,
+                        SparseFieldsMixin, ValuesListMixin)
+from api.pagination import (IdCursorOrLimitOffsetPagination, MyPaginator,
+                            PubDateCursorOrPagePagination)
 from api.permissions import (IsAdmin, IsAdminModeratorAuthorOrReadOnly,
                              IsAdminOrReadOnly)
-from api.serializers import (CategorySerializer, CommentSerializer,
-                             GenreSerializer, ReviewSerializer,
-                             SignUpSerializer, TitleSafeSerializer,
-                             TitleSerializer, TokenSeriliazer, UserSerializer)
+from api.renderers import CSVRenderer, NDJSONRenderer
+from api.serializers import (CategoryBulkSerializer, CategorySerializer,
+                             ChangeEventSerializer, ChangesQuerySerializer,
+                             CommentSerializer, GenreBulkSerializer,
+                             GenreSerializer, LeaderboardQuerySerializer,
+                             ReviewSerializer, ScoreStatsSerializer,
+                             SignUpSerializer, SlugNameValuesSerializer,
+                             TitleBulkSerializer, TitleDetailSerializer,
+                             TitlePageSerializer, TitleSafeSerializer,
+                             TitleSerializer, TitleValuesSerializer,
+                             TokenRefreshSerializer, TokenSeriliazer,
+                             UserSerializer)
+from api.throttling import throttle_scope
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.db.models import Avg, ExpressionWrapper, fields
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, permissions, status, viewsets
-from rest_framework.decorators import action, api_view
+from rest_framework import filters, mixins, permissions, status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.tokens import AccessToken
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.changes import get_changes
+from reviews.export import iter_export
+from reviews.leaderboard import get_top
+from reviews.models import (SCORE_FIELDS, Category, Comment, Genre, Review,
+                            Title, TitleGenre)
+from reviews.outbox import enqueue
 
 User = get_user_model()
 
@@ -30,10 +53,11 @@ class UserViewSet(ModelViewSet):
         IsAdmin,
     ]
     lookup_field = "username"
-    pagination_class = LimitOffsetPagination
+    pagination_class = IdCursorOrLimitOffsetPagination
     filter_backends = (filters.SearchFilter,)
     search_fields = ("username",)
     http_method_names = ["get", "post", "delete", "patch"]
+    throttle_scope = "users"
 
     @action(
         detail=False,
@@ -44,17 +68,18 @@ class UserViewSet(ModelViewSet):
         ],
     )
     def get_current_user(self, request):
+        # В request.user только поля из токена, профиль читаем целиком.
+        user = User.objects.get(pk=request.user.pk)
         if request.method == "GET":
-            serializer = UserSerializer(request.user)
+            serializer = UserSerializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
-        serializer = UserSerializer(
-            request.user, data=request.data, partial=True
-        )
+        serializer = UserSerializer(user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save(role=request.user.role, partial=True)
+        serializer.save(role=user.role, partial=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@throttle_scope("signup")
 @api_view(["POST"])
 def signup(request):
     serializer = SignUpSerializer(data=request.data)
@@ -75,19 +100,23 @@ def signup(request):
             {"detail": "username exist"}, status=status.HTTP_400_BAD_REQUEST
         )
 
-    user, _ = User.objects.get_or_create(
-        username=serializer.validated_data["username"],
-        email=serializer.validated_data["email"],
-    )
-    confirmation_code = default_token_generator.make_token(user)
-    user.email_user(
-        subject="Код подтверждения",
-        message=f"Ваш код - {confirmation_code}",
-        from_email="admin@admin.ru",
-    )
+    # Письмо отправит send_outbox, запрос только пишет в базу.
+    with transaction.atomic():
+        user, _ = User.objects.get_or_create(
+            username=serializer.validated_data["username"],
+            email=serializer.validated_data["email"],
+        )
+        confirmation_code = default_token_generator.make_token(user)
+        enqueue(
+            recipient=user.email,
+            subject="Код подтверждения",
+            message=f"Ваш код - {confirmation_code}",
+            from_email="admin@admin.ru",
+        )
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@throttle_scope("token")
 @api_view(["POST"])
 def token(request):
     serializer = TokenSeriliazer(data=request.data)
@@ -97,50 +126,82 @@ def token(request):
         )
         confirmation_code = serializer.validated_data["confirmation_code"]
         if default_token_generator.check_token(user, confirmation_code):
-            access_token = AccessToken.for_user(user)
+            refresh = get_refresh_token(user)
             data = {
                 "username": request.data["username"],
-                "token": str(access_token),
+                "token": str(refresh.access_token),
+                "refresh": str(refresh),
             }
             return Response(data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-def get_value(self, field, title=None):
-    value_id = self.kwargs.get(f'{field}')
-    if title:
-        return get_object_or_404(Review, id=value_id, title=title)
-    return get_object_or_404(Title, id=value_id)
-
-
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(SparseFieldsMixin, CreateThrottleMixin,
+                    ConditionalReadMixin, CachedReadMixin, BatchListMixin,
+                    viewsets.ModelViewSet):
+    cache_resource = 'reviews'
+    select_related_fields = ('author',)
+    throttle_scope = 'reviews'
     serializer_class = ReviewSerializer
     permission_classes = (IsAdminModeratorAuthorOrReadOnly,)
+    pagination_class = PubDateCursorOrPagePagination
+
+    @cached_property
+    def title(self):
+        return get_object_or_404(Title.objects.only('id'),
+                                 id=self.kwargs.get('title_id'))
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user,
-                        title=get_value(self, 'title_id'))
+        serializer.save(author=self.request.user, title=self.title)
 
     def get_queryset(self):
-        return get_value(self, 'title_id').reviews.all()
+        if self.action == 'list':
+            # Список отзывов несуществующего произведения это 404.
+            reviews = self.title.reviews.all()
+        else:
+            reviews = Review.objects.filter(
+                title_id=self.kwargs.get('title_id')
+            )
+        return self.trim_queryset(reviews)
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(SparseFieldsMixin, CreateThrottleMixin,
+                     ConditionalReadMixin, ModelViewSet):
+    cache_resource = 'comments'
+    select_related_fields = ('author',)
+    throttle_scope = 'comments'
     serializer_class = CommentSerializer
     permission_classes = (IsAdminModeratorAuthorOrReadOnly,)
+    pagination_class = PubDateCursorOrPagePagination
 
+    @cached_property
     def review(self):
-        title = get_value(self, 'title_id')
-        return get_value(self, 'review_id', title=title)
+        """Отзыв из адреса: пара title_id/review_id проверяется сразу."""
+        return get_object_or_404(
+            Review.objects.only('id', 'title_id'),
+            id=self.kwargs.get('review_id'),
+            title_id=self.kwargs.get('title_id'),
+        )
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.review())
+        serializer.save(author=self.request.user, review=self.review)
 
     def get_queryset(self):
-        return Comment.objects.filter(review=self.review())
+        if self.action == 'list':
+            comments = self.review.comments.all()
+        else:
+            comments = Comment.objects.filter(
+                review_id=self.kwargs.get('review_id'),
+                review__title_id=self.kwargs.get('title_id'),
+            )
+        return self.trim_queryset(comments)
 
 
-class CategoryViewSet(ListCreateDeleteViewSet):
+class CategoryViewSet(BulkCreateMixin, CachedListMixin, ValuesListMixin,
+                      ListCreateDeleteViewSet):
+    cache_resource = 'categories'
+    values_serializer_class = SlugNameValuesSerializer
+    bulk_serializer_class = CategoryBulkSerializer
     queryset = Category.objects.get_queryset().order_by('id')
     serializer_class = CategorySerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -153,8 +214,19 @@ class CategoryViewSet(ListCreateDeleteViewSet):
         self.perform_destroy(category)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=True, methods=['GET'])
+    def stats(self, request, pk=None):
+        category = get_object_or_404(Category.objects.only('id'), slug=pk)
+        return Response(ScoreStatsSerializer(
+            Title.objects.filter(category=category).get_score_stats()
+        ).data)
+
 
-class GenreViewSet(ListCreateDeleteViewSet):
+class GenreViewSet(BulkCreateMixin, CachedListMixin, ValuesListMixin,
+                   ListCreateDeleteViewSet):
+    cache_resource = 'genres'
+    values_serializer_class = SlugNameValuesSerializer
+    bulk_serializer_class = GenreBulkSerializer
     queryset = Genre.objects.get_queryset().order_by('id')
     serializer_class = GenreSerializer
     pagination_class = LimitOffsetPagination
@@ -167,20 +239,152 @@ class GenreViewSet(ListCreateDeleteViewSet):
         self.perform_destroy(genre)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=True, methods=['GET'])
+    def stats(self, request, pk=None):
+        genre = get_object_or_404(Genre.objects.only('id'), slug=pk)
+        return Response(ScoreStatsSerializer(Title.objects.filter(
+            id__in=TitleGenre.objects.filter(genre=genre).values('title_id')
+        ).get_score_stats()).data)
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.prefetch_related("reviews").annotate(
-        rating=ExpressionWrapper(
-            Avg("reviews__score"),
-            output_field=fields.IntegerField()
-        )
-    )
-    pagination_class = LimitOffsetPagination
+
+class TitleViewSet(SparseFieldsMixin, BulkCreateMixin, ConditionalReadMixin,
+                   CachedReadMixin, BatchListMixin, ValuesListMixin,
+                   viewsets.ModelViewSet):
+    values_serializer_class = TitleValuesSerializer
+    bulk_serializer_class = TitleBulkSerializer
+    queryset = Title.objects.all()
+    select_related_fields = ("category",)
+    prefetch_related_fields = ("genre",)
+    deferred_fields = ("search_vector",)
+    field_sources = {"scores": SCORE_FIELDS}
+    pagination_class = IdCursorOrLimitOffsetPagination
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = MyTitleFilter
+    # Сколько последних отзывов выводит ?include=reviews.
+    included_reviews_count = 5
+
+    @cached_property
+    def includes(self):
+        """Что ещё вывести в retrieve: ?include=reviews."""
+        if self.action != "retrieve":
+            return set()
+        return self.get_names("include", ("reviews",)) or set()
+
+    @property
+    def cache_resource(self):
+        # Отзывы с числом комментариев меняются без записи в произведение.
+        return "title_pages" if "reviews" in self.includes else "titles"
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=(IsAdmin,),
+        renderer_classes=(NDJSONRenderer, CSVRenderer),
+    )
+    def export(self, request):
+        """Весь каталог потоком, без пагинации: см. reviews.export."""
+        export_format = request.accepted_renderer.format
+        response = StreamingHttpResponse(
+            iter_export(export_format),
+            content_type=(f"{request.accepted_renderer.media_type}; "
+                          f"charset=utf-8"),
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="titles.{export_format}"'
+        )
+        return response
+
+    def get_queryset(self):
+        return self.trim_queryset(super().get_queryset())
+
+    def get_object(self):
+        title = super().get_object()
+        if "reviews" in self.includes:
+            title.included_reviews = self.get_included_reviews(title)
+        return title
+
+    def get_included_reviews(self, title):
+        """Последние отзывы с авторами и числом комментариев одним запросом.
+
+        Отзывы читаются индексом review_title_pub_date_idx уже по порядку,
+        комментарии считаются подзапросом только для них.
+        """
+        comments = Comment.objects.filter(
+            review=OuterRef("pk")
+        ).order_by().values("review").annotate(total=Count("id"))
+        return list(Review.objects.filter(title_id=title.pk).select_related(
+            "author"
+        ).only(
+            "id", "text", "score", "pub_date", "author__username"
+        ).annotate(
+            comments_count=Coalesce(Subquery(comments.values("total")), 0)
+        ).order_by("-pub_date", "-id")[:self.included_reviews_count])
 
     def get_serializer_class(self):
-        if self.action in ('create', 'partial_update', 'destroy'):
+        if self.action in ('create', 'bulk_create', 'partial_update',
+                           'destroy'):
             return TitleSerializer
+        if self.action == 'retrieve':
+            if "reviews" in self.includes:
+                return TitlePageSerializer
+            return TitleDetailSerializer
         return TitleSafeSerializer
+
+
+class LeaderboardViewSet(ConditionalReadMixin, CachedListMixin,
+                         ValuesListMixin, mixins.ListModelMixin,
+                         viewsets.GenericViewSet):
+    """Лучшие произведения из таблицы reviews.leaderboard.
+
+    Общий рейтинг или по ?genre=slug, ?category=slug; ?limit= первых.
+    """
+    cache_resource = "titles"
+    serializer_class = TitleSafeSerializer
+    values_serializer_class = TitleValuesSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        params = LeaderboardQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        place = dict(params.validated_data)
+        limit = place.pop("limit")
+        return get_top(**place).select_related("category").prefetch_related(
+            "genre"
+        )[:limit]
+
+
+@api_view(["GET"])
+@permission_classes([IsAdmin])
+def changes(request):
+    """Лента изменений после курсора ?since=, см. reviews.changes.
+
+    cursor это since для следующего запроса; next есть, пока страница
+    заполнена целиком. Событие доставляется, если его транзакция
+    завершилась за CHANGES['GAP_TIMEOUT'] секунд после того, как стало
+    видно событие с большим id; более позднее событие теряется.
+    """
+    params = ChangesQuerySerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    since = params.validated_data["since"]
+    limit = params.validated_data["limit"]
+    events = get_changes(since, limit)
+    cursor = events[-1].id if events else since
+    next_url = None
+    if len(events) == limit:
+        next_url = replace_query_param(
+            request.build_absolute_uri(), "since", cursor
+        )
+    return Response({
+        "cursor": cursor,
+        "next": next_url,
+        "results": ChangeEventSerializer(events, many=True).data,
+    })
+
+
+@throttle_scope("token_refresh")
+@api_view(["POST"])
+def token_refresh(request):
+    serializer = TokenRefreshSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return Response(serializer.validated_data, status=status.HTTP_200_OK)
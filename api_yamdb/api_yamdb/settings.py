@@ -75,6 +75,73 @@ DATABASES = {
     }
 }
 
+# Cache
+
+# Версии и отметки времени для кэша ответов, ETag и Last-Modified API
+# хранятся в этом кэше, и их меняют все воркеры gunicorn, сервис outbox и
+# команды manage.py. Поэтому по умолчанию это общий memcached из
+# docker-compose.yaml; LocMemCache у каждого процесса свой, он подходит
+# только для тестов и разработки в одном процессе.
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND',
+    default='django.core.cache.backends.memcached.PyMemcacheCache'
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', default='memcached:11211'),
+    }
+}
+if CACHE_BACKEND == 'django.core.cache.backends.locmem.LocMemCache':
+    # Клиенту memcached OPTIONS передаются как есть.
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', default=10000)),
+    }
+
+API_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.getenv('API_CACHE_TIMEOUT', default=60)),
+    'TIMEOUTS': {
+        'categories': 600,
+        'genres': 600,
+    },
+    'STATS': True,
+}
+
+# Частоты запросов по throttle_scope вьюсетов, с IP и от пользователя
+# (для signup и token от username в теле запроса), см. api.throttling.
+API_THROTTLE = {
+    'ALIAS': 'default',
+    'RATES': {
+        'signup': {'ip': '20/hour', 'username': '5/hour'},
+        'token': {'ip': '60/min', 'username': '10/min'},
+        'token_refresh': {'ip': '120/min'},
+        'reviews': {'ip': '60/min', 'username': '10/min'},
+        'comments': {'ip': '120/min', 'username': '30/min'},
+        'users': {'ip': '600/min', 'username': '300/min'},
+    },
+}
+
+# Сколько секунд процесс доверяет отметке отзыва токенов пользователя.
+API_AUTH = {
+    'USER_TTL': int(os.getenv('API_AUTH_USER_TTL', default=30)),
+    'MAX_USERS': 10000,
+}
+
+# Произведение попадает в таблицу лучших, набрав MIN_REVIEWS отзывов;
+# после изменения порога нужна команда rebuild_leaderboard.
+LEADERBOARD = {
+    'MIN_REVIEWS': int(os.getenv('LEADERBOARD_MIN_REVIEWS', default=1)),
+    'MAX_LIMIT': 100,
+}
+
+# Лента /api/v1/changes/, события старше KEEP_DAYS удаляет prune_changes.
+CHANGES = {
+    'GAP_TIMEOUT': int(os.getenv('CHANGES_GAP_TIMEOUT', default=300)),
+    'MAX_LIMIT': 1000,
+    'KEEP_DAYS': int(os.getenv('CHANGES_KEEP_DAYS', default=30)),
+}
+
 AUTH_USER_MODEL = "reviews.User"
 
 # Password validation
@@ -120,18 +187,49 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication"
+        "api.authentication.ClaimsJWTAuthentication"
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
+    "DEFAULT_THROTTLE_CLASSES": [
+        "api.throttling.IPThrottle",
+        "api.throttling.UsernameThrottle",
+    ],
+    # Перед приложением стоит nginx, он передаёт адрес клиента в
+    # X-Forwarded-For; адреса, присланные клиентом, не учитываются.
+    "NUM_PROXIES": 1,
     "DEFAULT_FILTER_BACKEND": [
         "django_filters.rest_framework.DjangoFilterBackend"
     ],
 }
 
+# Чёрный список refresh-токенов стоит одного запроса к базе на каждый
+# refresh и требует приложения token_blacklist, поэтому он включается
+# переменной окружения вместе с ротацией.
+JWT_BLACKLIST = os.getenv('JWT_BLACKLIST', default='False') == 'True'
+if JWT_BLACKLIST:
+    INSTALLED_APPS.append("rest_framework_simplejwt.token_blacklist")
+
 SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=5),
+    "REFRESH_TOKEN_LIFETIME": timedelta(
+        days=int(os.getenv('JWT_REFRESH_DAYS', default=7))
+    ),
+    "ROTATE_REFRESH_TOKENS": (
+        JWT_BLACKLIST
+        or os.getenv('JWT_ROTATE_REFRESH_TOKENS', default='False') == 'True'
+    ),
+    "BLACKLIST_AFTER_ROTATION": JWT_BLACKLIST,
 }
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
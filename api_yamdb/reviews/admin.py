@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Genre, Review, Title, User
+from .models import (Category, ChangeEvent, Comment, Genre, OutboxEmail,
+                     Review, Title, User)
 
 admin.site.register(User)
 admin.site.register(Title)
@@ -8,3 +9,5 @@ admin.site.register(Category)
 admin.site.register(Genre)
 admin.site.register(Review)
 admin.site.register(Comment)
+admin.site.register(OutboxEmail)
+admin.site.register(ChangeEvent)
@@ -0,0 +1,85 @@
+"""Лента изменений для инкрементальной синхронизации, см. ChangeEvent.
+
+Сигналы reviews.signals пишут событие при каждом сохранении и удалении
+произведения, жанра, категории, отзыва и комментария в той же
+транзакции, что и сам объект. Потребитель читает ленту по курсору
+(id последнего события) и перечитывает изменившиеся объекты.
+
+События есть только у самого объекта. Рейтинг произведения меняют
+события его отзывов, вложенные в произведение жанр и категорию меняют
+их собственные события; load_db событий не пишет, после загрузки
+потребители синхронизируются заново.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Category, ChangeEvent, Comment, Genre, Review, Title
+
+DEFAULTS = {
+    # Сколько секунд ждать транзакцию, которая взяла id события раньше
+    # уже видимых, но ещё не завершилась. Событие транзакции, которая
+    # длится дольше, потребители пропустят.
+    'GAP_TIMEOUT': 300,
+    'MAX_LIMIT': 1000,
+    'KEEP_DAYS': 30,
+}
+# Ресурс API и поля, по которым объект в нём находится.
+MODEL_KEYS = {
+    Title: ('titles', ('id',)),
+    Genre: ('genres', ('id', 'slug')),
+    Category: ('categories', ('id', 'slug')),
+    Review: ('reviews', ('id', 'title_id')),
+    Comment: ('comments', ('id', 'review_id')),
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'CHANGES', {}).get(name, DEFAULTS[name])
+
+
+def get_event(instance, action):
+    resource, fields = MODEL_KEYS[type(instance)]
+    return ChangeEvent(
+        resource=resource, object_id=instance.pk, action=action,
+        key={name: getattr(instance, name) for name in fields},
+    )
+
+
+def record(instances, action, using=None):
+    """Пишет события одним INSERT."""
+    events = [get_event(instance, action) for instance in instances]
+    if events:
+        ChangeEvent.objects.using(using).bulk_create(events)
+
+
+def get_changes(since, limit, using=None):
+    """События после курсора since по порядку, не больше limit.
+
+    Значения последовательности берутся при вставке, а видны после
+    фиксации транзакции, поэтому событие с меньшим id может появиться
+    позже события с большим. Выдача останавливается перед свежим
+    пропуском в id: потребитель продолжит с него и ничего не потеряет.
+    Пропуск старше GAP_TIMEOUT считается откатом и пропускается: если
+    транзакция держит id дольше, её событие никто не получит. С
+    since=0 лента начинается с первого сохранённого события: старые
+    события могли быть удалены prune_changes.
+    """
+    events = list(
+        ChangeEvent.objects.using(using).filter(id__gt=since)[:limit]
+    )
+    settled = timezone.now() - timedelta(seconds=get_setting('GAP_TIMEOUT'))
+    expected = since + 1 if since else None
+    for index, event in enumerate(events):
+        if expected not in (None, event.id) and event.created > settled:
+            return events[:index]
+        expected = event.id + 1
+    return events
+
+
+def prune(days, using=None):
+    """Удаляет события старше days дней, возвращает их число."""
+    return ChangeEvent.objects.using(using).filter(
+        created__lt=timezone.now() - timedelta(days=days)
+    ).delete()[0]
@@ -0,0 +1,79 @@
+"""Выгрузка каталога произведений в NDJSON и CSV.
+
+Произведения и их связи с жанрами читаются двумя курсорами в порядке
+title_id и сливаются на лету, поэтому память не растёт с числом строк:
+на PostgreSQL iterator() использует серверные курсоры, без OFFSET и без
+группировки.
+"""
+import csv
+import json
+
+from .models import Title, TitleGenre
+
+FIELDS = ('id', 'name', 'year', 'description', 'category', 'genre', 'rating')
+FORMATS = ('ndjson', 'csv')
+CHUNK_SIZE = 2000
+
+
+def iter_titles(chunk_size=CHUNK_SIZE, using=None):
+    titles = Title.objects.using(using).order_by('id').values_list(
+        'id', 'name', 'year', 'description', 'category__slug', 'rating'
+    ).iterator(chunk_size=chunk_size)
+    links = TitleGenre.objects.using(using).order_by(
+        'title_id', 'genre__slug'
+    ).values_list('title_id', 'genre__slug').iterator(chunk_size=chunk_size)
+    link = next(links, None)
+    for title_id, name, year, description, category, rating in titles:
+        # Связи удалённых между двумя запросами произведений пропускаем.
+        while link is not None and link[0] < title_id:
+            link = next(links, None)
+        genres = []
+        while link is not None and link[0] == title_id:
+            genres.append(link[1])
+            link = next(links, None)
+        yield {
+            'id': title_id,
+            'name': name,
+            'year': year,
+            'description': description,
+            'category': category,
+            'genre': genres,
+            'rating': rating,
+        }
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow([
+            ','.join(row['genre']) if field == 'genre' else row[field]
+            for field in FIELDS
+        ])
+
+
+def iter_export(export_format, chunk_size=CHUNK_SIZE, using=None):
+    """Строки выгрузки, склеенные в куски по chunk_size строк."""
+    lines = {'ndjson': iter_ndjson, 'csv': iter_csv}[export_format](
+        iter_titles(chunk_size, using)
+    )
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
@@ -0,0 +1,140 @@
+"""Таблица лучших произведений: общая, по жанрам и по категориям.
+
+Строки LeaderboardEntry повторяют рейтинг и число отзывов произведения и
+обновляются сигналами reviews.signals при каждой записи отзыва: обычно
+одним UPDATE по индексу title_id. Произведение попадает в таблицу, когда
+набирает LEADERBOARD['MIN_REVIEWS'] отзывов, и уходит, когда их
+становится меньше. После смены порога таблицу пересобирает команда
+rebuild_leaderboard.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Category, Genre, LeaderboardEntry, Title, TitleGenre
+
+DEFAULTS = {
+    'MIN_REVIEWS': 1,
+    'MAX_LIMIT': 100,
+}
+BATCH_SIZE = 2000
+
+
+def get_setting(name):
+    return getattr(settings, 'LEADERBOARD', {}).get(name, DEFAULTS[name])
+
+
+def get_min_reviews():
+    # Без отзывов у произведения нет рейтинга.
+    return max(get_setting('MIN_REVIEWS'), 1)
+
+
+def is_ranked(title):
+    """Может ли произведение быть в таблице; без лишних запросов."""
+    reviews_count = title.__dict__.get('reviews_count')
+    return reviews_count is None or reviews_count >= get_min_reviews()
+
+
+def get_entries(titles, using=None):
+    """Строки таблицы для (id, category_id, rating, reviews_count)."""
+    genres = {}
+    for title_id, genre_id in TitleGenre.objects.using(using).filter(
+        title_id__in=[title[0] for title in titles]
+    ).values_list('title_id', 'genre_id'):
+        genres.setdefault(title_id, []).append(genre_id)
+    for title_id, category_id, rating, reviews_count in titles:
+        places = [{}] + [{'genre_id': genre_id}
+                         for genre_id in genres.get(title_id, ())]
+        if category_id is not None:
+            places.append({'category_id': category_id})
+        for place in places:
+            yield LeaderboardEntry(title_id=title_id, rating=rating,
+                                   reviews_count=reviews_count, **place)
+
+
+def add_titles(titles, using=None):
+    """Добавляет строки произведений из queryset Title, если их пора."""
+    titles = list(titles.filter(
+        reviews_count__gte=get_min_reviews()
+    ).values_list('id', 'category_id', 'rating', 'reviews_count'))
+    if titles:
+        LeaderboardEntry.objects.using(using).bulk_create(
+            get_entries(titles, using), batch_size=BATCH_SIZE
+        )
+
+
+def rebuild_titles(title_ids, using=None):
+    """Пересобирает строки произведений целиком."""
+    with transaction.atomic(using, savepoint=False):
+        LeaderboardEntry.objects.using(using).filter(
+            title_id__in=title_ids
+        ).delete()
+        add_titles(Title.objects.using(using).filter(id__in=title_ids),
+                   using)
+
+
+def rebuild(using=None):
+    """Пересобирает всю таблицу, например после load_db."""
+    with transaction.atomic(using):
+        LeaderboardEntry.objects.using(using).all().delete()
+        titles = Title.objects.using(using).order_by('id')
+        last_id = 0
+        while True:
+            batch = titles.filter(id__gt=last_id)[:BATCH_SIZE]
+            ids = list(batch.values_list('id', flat=True))
+            if not ids:
+                break
+            add_titles(titles.filter(id__in=ids), using)
+            last_id = ids[-1]
+
+
+def update_title(title_id, count_delta, using=None):
+    """Переносит в таблицу рейтинг произведения после записи отзыва.
+
+    count_delta это изменение числа отзывов: строки удаляются, только
+    если отзывов стало меньше, и создаются, только если их стало больше.
+    """
+    entries = LeaderboardEntry.objects.using(using).filter(title_id=title_id)
+    titles = Title.objects.using(using).filter(id=title_id)
+    if count_delta < 0:
+        entries.filter(
+            title__reviews_count__lt=get_min_reviews()
+        ).delete()
+    title = Title.objects.using(using).filter(id=OuterRef('title_id'))
+    updated = entries.update(
+        rating=Subquery(title.values('rating')),
+        reviews_count=Subquery(title.values('reviews_count')),
+    )
+    if not updated and count_delta > 0:
+        add_titles(titles, using)
+
+
+def get_top(genre=None, category=None, using=None):
+    """Произведения рейтинга по порядку, queryset Title.
+
+    Без genre и category это общий рейтинг; genre и category это slug.
+    """
+    # id по slug подзапросом: с константой вместо JOIN индекс отдаёт
+    # строки уже в нужном порядке.
+    if genre is not None:
+        place = {'genre__isnull': False, 'genre': Subquery(
+            Genre.objects.using(using).filter(slug=genre).values('id')
+        )}
+    elif category is not None:
+        place = {'category__isnull': False, 'category': Subquery(
+            Category.objects.using(using).filter(slug=category).values('id')
+        )}
+    else:
+        place = {'genre__isnull': True, 'category__isnull': True}
+    # Порог заодно делает JOIN внутренним и отсекает строки, оставшиеся
+    # после его повышения до rebuild_leaderboard.
+    place['reviews_count__gte'] = get_min_reviews()
+    # Одно условие filter(), чтобы все поля брались из одной строки.
+    return Title.objects.using(using).filter(**{
+        f'leaderboard_entries__{name}': value
+        for name, value in place.items()
+    }).order_by(
+        '-leaderboard_entries__rating',
+        '-leaderboard_entries__reviews_count',
+        'id',
+    )
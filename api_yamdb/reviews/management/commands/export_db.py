@@ -0,0 +1,120 @@
+import csv
+import gzip
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from reviews.management.commands.load_db import FILES_MODELS
+from reviews.models import SCORE_FIELDS, Title
+
+# Колонки внешних ключей называются так же, как в static/data.
+COLUMN_NAMES = {'author_id': 'author', 'category_id': 'category'}
+# load_db пересчитывает их сам.
+DERIVED_FIELDS = {
+    Title: ('score_sum', 'reviews_count', 'rating', 'search_vector',
+            *SCORE_FIELDS),
+}
+# Служебные поля: время изменения для ленты изменений и отметка отзыва
+# токенов. load_db ставит свои значения.
+TRACKING_FIELDS = ('updated_at', 'token_stamp')
+# Сжатие по скорости, а не по размеру: выгрузка упирается в gzip.
+GZIP_LEVEL = 1
+
+
+def get_columns(model):
+    return [
+        (field, COLUMN_NAMES.get(field.attname, field.attname))
+        for field in model._meta.concrete_fields
+        if field.name not in DERIVED_FIELDS.get(model, ())
+        and field.name not in TRACKING_FIELDS
+    ]
+
+
+class Command(BaseCommand):
+    """Выгрузка базы в csv-файлы в формате load_db.
+    Запуск командой: python manage.py export_db --data-dir dump [--gzip]
+
+    Таблицы пишутся в порядке FILES_MODELS из одного снимка базы
+    (на PostgreSQL транзакция REPEATABLE READ READ ONLY): на PostgreSQL
+    через COPY TO STDOUT, на остальных базах через iterator(). Файлы
+    загружаются обратно командой load_db, в том числе сжатые.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir', type=Path, required=True,
+            help='Каталог для csv-файлов, будет создан при необходимости.',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Сжимать файлы (users.csv.gz и т. д.).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Сколько строк читать из базы за раз (кроме COPY).',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть больше нуля')
+        data_dir = options['data_dir']
+        data_dir.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = options['chunk_size']
+        dump = (self.copy_table if connection.vendor == 'postgresql'
+                else self.write_rows)
+        with self.snapshot():
+            for name, model in FILES_MODELS.items():
+                path = data_dir / (f'{name}.gz' if options['gzip'] else name)
+                with self.open(path) as file:
+                    total = dump(file, model)
+                if options['verbosity']:
+                    self.stdout.write(f'{path.name}: выгружено {total} строк')
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS('Выгрузка завершена'))
+
+    @contextmanager
+    def snapshot(self):
+        nested = connection.in_atomic_block
+        with transaction.atomic():
+            # Уровень изоляции задаётся только первым запросом транзакции.
+            if connection.vendor == 'postgresql' and not nested:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL '
+                                   'REPEATABLE READ READ ONLY')
+            yield
+
+    @staticmethod
+    def open(path):
+        if path.suffix == '.gz':
+            return gzip.open(path, 'wt', encoding='utf-8', newline='',
+                             compresslevel=GZIP_LEVEL)
+        return open(path, 'w', encoding='utf-8', newline='')
+
+    def copy_table(self, file, model):
+        quote = connection.ops.quote_name
+        columns = ', '.join(
+            f'{quote(field.column)} AS {quote(name)}'
+            for field, name in get_columns(model)
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY (SELECT {columns} '
+                f'FROM {quote(model._meta.db_table)} ORDER BY 1) '
+                'TO STDOUT WITH (FORMAT csv, HEADER)',
+                file,
+            )
+            return cursor.rowcount
+
+    def write_rows(self, file, model):
+        columns = get_columns(model)
+        writer = csv.writer(file)
+        writer.writerow([name for _, name in columns])
+        total = 0
+        for row in model.objects.order_by('pk').values_list(
+            *[field.attname for field, _ in columns]
+        ).iterator(chunk_size=self.chunk_size):
+            writer.writerow(['' if value is None else value
+                             for value in row])
+            total += 1
+        return total
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from reviews.export import CHUNK_SIZE, FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    """Выгрузка произведений с категорией, жанрами и рейтингом.
+    Запуск командой: python manage.py export_titles --format csv -o titles.csv
+
+    Строки пишутся по мере чтения из базы, как и в
+    GET /api/v1/titles/export/, поэтому размер каталога на память
+    не влияет.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=FORMATS, default='ndjson',
+            help='Формат выгрузки (по умолчанию ndjson).',
+        )
+        parser.add_argument(
+            '-o', '--output', type=Path,
+            help='Файл для выгрузки, по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть больше нуля')
+        chunks = iter_export(options['format'], options['chunk_size'])
+        if options['output'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as file:
+            for chunk in chunks:
+                file.write(chunk)
@@ -1,11 +1,22 @@
 import csv
+import gzip
+from contextlib import contextmanager
+from io import StringIO
+from itertools import islice
 from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from api.cache import bump_version
+from api.signals import RESOURCES
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from reviews import leaderboard
 from reviews.models import (Category, Comment, Genre, Review, Title,
                             TitleGenre, User)
+from reviews.search import rebuild_index
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent.parent
+DATA_DIR = BASE_DIR / 'static' / 'data'
 FILES_MODELS = {'users.csv': User,
                 'category.csv': Category,
                 'genre.csv': Genre,
@@ -20,26 +31,175 @@ INSTANCE_FIELDS = {'category': Category,
                    'review': Review}
 
 
+def get_field(model, column):
+    if column in INSTANCE_FIELDS:
+        column = f'{column}_id'
+    for field in model._meta.concrete_fields:
+        if column in (field.name, field.attname):
+            return field
+    raise CommandError(f'{model.__name__}: неизвестная колонка {column}')
+
+
+def find_file(data_dir, name):
+    """users.csv или сжатый export_db --gzip users.csv.gz."""
+    for path in (data_dir / name, data_dir / f'{name}.gz'):
+        if path.is_file():
+            return path
+    return None
+
+
+def to_copy_line(values):
+    """Строка для COPY ... WITH (FORMAT csv): None без кавычек это NULL."""
+    return ','.join(
+        '' if value is None else '"{}"'.format(str(value).replace('"', '""'))
+        for value in values
+    ) + '\n'
+
+
+@contextmanager
+def csv_dates(fields):
+    """Даты из файла не должны подменяться auto_now_add при вставке."""
+    auto_fields = [field for field in fields
+                   if getattr(field, 'auto_now_add', False)]
+    for field in auto_fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in auto_fields:
+            field.auto_now_add = True
+
+
 class Command(BaseCommand):
     """Скрипт загрузки в базу данных в формате csv.
     Запуск командой: python manage.py load_db
+
+    Файлы читаются построчно и вставляются пачками в одной транзакции:
+    на PostgreSQL через COPY FROM STDIN, на остальных базах через
+    bulk_create. После загрузки сбрасываются последовательности id,
+    пересчитываются рейтинги произведений, таблица лучших и поисковый
+    индекс. Файлы могут быть сжаты gzip (users.csv.gz), как их пишет
+    export_db.
     """
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir', type=Path, default=DATA_DIR,
+            help='Каталог с csv-файлами (по умолчанию static/data).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько строк вставлять за один запрос.',
+        )
+        parser.add_argument(
+            '--truncate', action='store_true',
+            help='Очистить таблицы перед загрузкой.',
+        )
+        parser.add_argument(
+            '--progress', action='store_true',
+            help='Печатать прогресс после каждой пачки.',
+        )
+
     def handle(self, *args, **options):
-        for name, model in FILES_MODELS.items():
-            with open(
-                    fr'{BASE_DIR}\static\data\{name}',
-                    encoding='utf-8') as file:
-                reader = csv.reader(file)
-                fields = next(reader)
-                for line in reader:
-                    new_obj = model()
-                    for count, item in enumerate(line):
-                        key = fields[count]
-                        if key in INSTANCE_FIELDS:
-                            setattr(
-                                new_obj, key, INSTANCE_FIELDS[key](pk=item)
-                            )
-                        else:
-                            setattr(new_obj, key, item)
-                    new_obj.save()
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        data_dir = options['data_dir']
+        paths = {name: find_file(data_dir, name) for name in FILES_MODELS}
+        missing = [name for name, path in paths.items() if path is None]
+        if missing:
+            raise CommandError(
+                f'В {data_dir} нет файлов: {", ".join(missing)}'
+            )
+        self.batch_size = options['batch_size']
+        self.progress = options['progress']
+        with transaction.atomic():
+            if options['truncate']:
+                self.truncate()
+            for name, model in FILES_MODELS.items():
+                total = self.load_file(paths[name], model)
+                if options['verbosity']:
+                    self.stdout.write(f'{name}: загружено {total} строк')
+            self.reset_sequences()
+            Title.objects.refresh_ratings()
+            leaderboard.rebuild(connection.alias)
+            rebuild_index(connection.alias)
+            # Сигналы при пачечной вставке не срабатывают.
+            transaction.on_commit(lambda: bump_version(*RESOURCES))
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
+
+    def truncate(self):
+        tables = [model._meta.db_table for model in FILES_MODELS.values()]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sql_flush(
+                no_style(), tables, allow_cascade=True
+            ):
+                cursor.execute(sql)
+
+    def reset_sequences(self):
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), list(FILES_MODELS.values())
+            ):
+                cursor.execute(sql)
+
+    def load_file(self, path, model):
+        insert = (self.copy_batch if connection.vendor == 'postgresql'
+                  else self.create_batch)
+        total = 0
+        opener = gzip.open if path.suffix == '.gz' else open
+        with opener(path, 'rt', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            fields = [get_field(model, column) for column in next(reader)]
+            with csv_dates(fields):
+                while True:
+                    batch = list(islice(reader, self.batch_size))
+                    if not batch:
+                        break
+                    insert(model, fields, batch)
+                    total += len(batch)
+                    if self.progress:
+                        self.stdout.write(f'{path.name}: {total}')
+        return total
+
+    @staticmethod
+    def clean(field, value):
+        if value == '' and field.null:
+            return None
+        return value
+
+    def create_batch(self, model, fields, rows):
+        model.objects.bulk_create(
+            model(**{field.attname: self.clean(field, value)
+                     for field, value in zip(fields, row)})
+            for row in rows
+        )
+
+    def copy_batch(self, model, fields, rows):
+        # Колонки, которых нет в файле, заполняются значениями
+        # по умолчанию: COPY ничего не знает о default из моделей.
+        blank = model()
+        defaults = {
+            field: field.get_db_prep_save(field.pre_save(blank, True),
+                                          connection)
+            for field in model._meta.concrete_fields
+            if field not in fields and not field.primary_key
+        }
+        columns = ', '.join(
+            connection.ops.quote_name(field.column)
+            for field in [*fields, *defaults]
+        )
+        buffer = StringIO()
+        for row in rows:
+            buffer.write(to_copy_line(
+                [self.clean(field, value)
+                 for field, value in zip(fields, row)]
+                + list(defaults.values())
+            ))
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+                f'({columns}) FROM STDIN WITH (FORMAT csv)',
+                buffer,
+            )
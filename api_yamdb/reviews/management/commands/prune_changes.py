@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from reviews import changes
+
+
+class Command(BaseCommand):
+    """Удаление старых событий ленты изменений.
+    Запуск командой: python manage.py prune_changes [--days 30]
+
+    Потребитель, который не читал ленту дольше --days дней, пропустит
+    удалённые события и должен синхронизироваться заново.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=changes.get_setting('KEEP_DAYS'),
+            help='Сколько дней хранить события.',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days должен быть больше нуля')
+        deleted = changes.prune(options['days'])
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено событий: {deleted}'
+            ))
@@ -0,0 +1,21 @@
+from api.cache import bump_version
+from django.core.management.base import BaseCommand
+from reviews import leaderboard
+from reviews.models import LeaderboardEntry
+
+
+class Command(BaseCommand):
+    """Пересборка таблицы лучших произведений.
+    Запуск командой: python manage.py rebuild_leaderboard
+
+    Таблицу обновляют сигналы при записи отзывов, пересобирать её нужно
+    после изменения LEADERBOARD_MIN_REVIEWS или правки базы в обход ORM.
+    """
+
+    def handle(self, *args, **options):
+        leaderboard.rebuild()
+        bump_version('titles')
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'В таблице {LeaderboardEntry.objects.count()} строк'
+            ))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from reviews.outbox import send_pending
+
+
+class Command(BaseCommand):
+    """Отправка писем из очереди OutboxEmail.
+    Запуск командой: python manage.py send_outbox [--loop]
+
+    Без --loop отправляет всё, что накопилось, и завершается; с --loop
+    работает как обработчик и опрашивает очередь каждые --interval секунд.
+    Неудачные письма повторяются с растущей паузой до --max-attempts раз.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько писем отправлять за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=5,
+            help='После стольких неудач письмо больше не отправляется.',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а ждать новые письма.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между опросами очереди в режиме --loop, секунды.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        self.verbosity = options['verbosity']
+        while True:
+            self.send_all(options['batch_size'], options['max_attempts'])
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
+
+    def send_all(self, batch_size, max_attempts):
+        # Письма с ошибкой получают send_after в будущем, поэтому
+        # в следующую пачку не попадают и цикл заканчивается.
+        while True:
+            sent, failed = send_pending(batch_size, max_attempts)
+            if self.verbosity and (sent or failed):
+                self.stdout.write(f'Отправлено {sent}, с ошибкой {failed}')
+            if sent + failed < batch_size:
+                break
@@ -0,0 +1,74 @@
+# Generated by Django 3.2 on 2026-10-18 05:53
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRES_FORWARD = (
+    """
+    CREATE FUNCTION reviews_title_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+            || setweight(
+                to_tsvector('russian', coalesce(NEW.description, '')), 'B'
+            );
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER reviews_title_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, description ON reviews_title
+    FOR EACH ROW EXECUTE PROCEDURE reviews_title_search_vector()
+    """,
+    """
+    UPDATE reviews_title SET search_vector =
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+    """,
+    'CREATE INDEX reviews_title_search_idx ON reviews_title '
+    'USING gin (search_vector)',
+)
+POSTGRES_BACKWARD = (
+    'DROP INDEX reviews_title_search_idx',
+    'DROP TRIGGER reviews_title_search_vector_update ON reviews_title',
+    'DROP FUNCTION reviews_title_search_vector()',
+)
+SQLITE_FORWARD = (
+    'CREATE VIRTUAL TABLE reviews_title_fts USING fts5(name, description)',
+    'INSERT INTO reviews_title_fts (rowid, name, description) '
+    "SELECT id, name, COALESCE(description, '') FROM reviews_title",
+)
+SQLITE_BACKWARD = (
+    'DROP TABLE reviews_title_fts',
+)
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        statements = {
+            'postgresql': postgres,
+            'sqlite': sqlite,
+        }.get(schema_editor.connection.vendor, ())
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+    ]
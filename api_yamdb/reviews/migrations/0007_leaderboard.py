@@ -0,0 +1,113 @@
+# Generated by Django 3.2 on 2026-10-18 06:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# ORDER BY rating DESC NULLS LAST, id; в SQLite NULL и так последние.
+POSTGRES_FORWARD = (
+    'CREATE INDEX title_rating_idx ON reviews_title '
+    '(rating DESC NULLS LAST, id)',
+)
+SQLITE_FORWARD = (
+    'CREATE INDEX title_rating_idx ON reviews_title (rating DESC, id)',
+)
+BACKWARD = (
+    'DROP INDEX title_rating_idx',
+)
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        statements = {
+            'postgresql': postgres,
+            'sqlite': sqlite,
+        }.get(schema_editor.connection.vendor, ())
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+def fill_leaderboard(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    TitleGenre = apps.get_model('reviews', 'TitleGenre')
+    LeaderboardEntry = apps.get_model('reviews', 'LeaderboardEntry')
+    min_reviews = max(
+        getattr(settings, 'LEADERBOARD', {}).get('MIN_REVIEWS', 1), 1
+    )
+    titles = {
+        title_id: (category_id, rating, reviews_count)
+        for title_id, category_id, rating, reviews_count
+        in Title.objects.filter(reviews_count__gte=min_reviews).values_list(
+            'id', 'category_id', 'rating', 'reviews_count'
+        )
+    }
+    places = [(title_id, None, None) for title_id in titles]
+    places += [
+        (title_id, genre_id, None) for title_id, genre_id
+        in TitleGenre.objects.values_list('title_id', 'genre_id')
+        if title_id in titles
+    ]
+    places += [(title_id, None, category_id)
+               for title_id, (category_id, _, _) in titles.items()
+               if category_id is not None]
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(title_id=title_id, genre_id=genre_id,
+                         category_id=category_id,
+                         rating=titles[title_id][1],
+                         reviews_count=titles[title_id][2])
+        for title_id, genre_id, category_id in places
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_outbox_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.PositiveSmallIntegerField()),
+                ('reviews_count', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ('-rating', '-reviews_count', 'title'),
+            },
+        ),
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(BACKWARD, BACKWARD),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='category',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.category'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='genre',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.genre'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='title',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='reviews.title'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(condition=models.Q(('category__isnull', True), ('genre__isnull', True)), fields=['-rating', '-reviews_count', 'title'], name='leaderboard_overall_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(condition=models.Q(genre__isnull=False), fields=['genre', '-rating', '-reviews_count', 'title'], name='leaderboard_genre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(condition=models.Q(category__isnull=False), fields=['category', '-rating', '-reviews_count', 'title'], name='leaderboard_category_idx'),
+        ),
+        migrations.RunPython(fill_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_stamp',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+    ]
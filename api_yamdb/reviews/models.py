@@ -1,9 +1,13 @@
 from api.validation import validate_year
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import ASCIIUsernameValidator
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinLengthValidator
-from django.db import models
-from django.db.models import TextField
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, TextField
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+from reviews.search import search as full_text_search
 
 
 class Role:
@@ -41,6 +45,9 @@ class User(AbstractUser):
         max_length=10, null=False, choices=ROLE_CHOICE, default=Role.USER
     )
     is_active = models.BooleanField(default=True)
+    # Отметка последнего отзыва токенов, см. api.authentication. Кэш
+    # может её потерять, поэтому она хранится и здесь.
+    token_stamp = models.BigIntegerField(default=0, editable=False)
 
     @property
     def is_admin(self):
@@ -53,9 +60,24 @@ class User(AbstractUser):
     REQUIRED_FIELDS = ["email"]
 
 
-class Category(models.Model):
+class AtomicSaveMixin:
+    """Сохранение вместе с обработчиками post_save в одной транзакции.
+
+    Сигналы пишут в базу рейтинг, таблицу лучших и ленту изменений
+    (reviews.changes), объект и эти записи должны попасть в базу вместе.
+    Точка сохранения не нужна: при ошибке откатывается вся внешняя
+    транзакция. Удаление Django и так выполняет в транзакции.
+    """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Category(AtomicSaveMixin, models.Model):
     name = models.CharField(max_length=256, unique=True)
     slug = models.SlugField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('id', )
@@ -64,9 +86,10 @@ class Category(models.Model):
         return self.name
 
 
-class Genre(models.Model):
+class Genre(AtomicSaveMixin, models.Model):
     name = models.CharField(max_length=256, unique=True)
     slug = models.SlugField(max_length=50, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ('id', )
@@ -75,7 +98,78 @@ class Genre(models.Model):
         return self.name
 
 
-class Title(models.Model):
+SCORES = range(1, 11)
+
+
+def get_score_field(score):
+    """Поле Title со счётчиком отзывов с этой оценкой."""
+    return f'score_{score}'
+
+
+SCORE_FIELDS = tuple(get_score_field(score) for score in SCORES)
+
+
+class TitleQuerySet(models.QuerySet):
+    def search(self, text):
+        """Ищет по названию и описанию, лучшие совпадения первыми."""
+        return full_text_search(self, text)
+
+    def apply_review_delta(self, scores):
+        """Сдвигает сохранённые сумму оценок, число отзывов и гистограмму.
+
+        scores это изменения счётчиков гистограммы, например {7: 1, 2: -1}
+        при смене оценки 2 на 7. Рейтинг пересчитывается тем же UPDATE из
+        старых значений, поэтому конкурентные изменения не теряются.
+        """
+        score_sum = F('score_sum') + sum(
+            score * delta for score, delta in scores.items()
+        )
+        reviews_count = F('reviews_count') + sum(scores.values())
+        return self.update(
+            score_sum=score_sum,
+            reviews_count=reviews_count,
+            rating=score_sum / NullIf(reviews_count, 0),
+            # Оценки вне 1..10 из старых данных в гистограмму не попадают.
+            **{get_score_field(score): F(get_score_field(score)) + delta
+               for score, delta in scores.items()
+               if delta and score in SCORES},
+        )
+
+    def get_score_stats(self):
+        """Сумма оценок, отзывов и гистограмм произведений одним запросом.
+
+        Читает только сохранённые счётчики, таблица отзывов не нужна.
+        """
+        return self.order_by().aggregate(
+            titles_count=Count('id'),
+            **{field: Coalesce(Sum(field), 0)
+               for field in ('score_sum', 'reviews_count', *SCORE_FIELDS)},
+        )
+
+    def refresh_ratings(self):
+        """Полностью пересчитывает рейтинг по таблице отзывов."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+
+        def aggregate(total):
+            return Coalesce(
+                Subquery(reviews.annotate(total=total).values('total')), 0
+            )
+
+        score_sum = aggregate(Sum('score'))
+        reviews_count = aggregate(Count('id'))
+        return self.update(
+            score_sum=score_sum,
+            reviews_count=reviews_count,
+            rating=score_sum / NullIf(reviews_count, 0),
+            **{get_score_field(score): aggregate(
+                Count('id', filter=Q(score=score))
+            ) for score in SCORES},
+        )
+
+
+class Title(AtomicSaveMixin, models.Model):
     name = models.CharField(max_length=256)
     year = models.PositiveSmallIntegerField(validators=[validate_year])
     description = models.TextField(blank=True, null=True)
@@ -90,17 +184,40 @@ class Title(models.Model):
         related_name='titles',
         null=True
     )
+    score_sum = models.PositiveIntegerField(default=0, editable=False)
+    reviews_count = models.PositiveIntegerField(default=0, editable=False)
+    rating = models.PositiveSmallIntegerField(
+        null=True, blank=True, editable=False
+    )
+    # Гистограмма: сколько отзывов с оценкой 1, 2, ... 10.
+    score_1 = models.PositiveIntegerField(default=0, editable=False)
+    score_2 = models.PositiveIntegerField(default=0, editable=False)
+    score_3 = models.PositiveIntegerField(default=0, editable=False)
+    score_4 = models.PositiveIntegerField(default=0, editable=False)
+    score_5 = models.PositiveIntegerField(default=0, editable=False)
+    score_6 = models.PositiveIntegerField(default=0, editable=False)
+    score_7 = models.PositiveIntegerField(default=0, editable=False)
+    score_8 = models.PositiveIntegerField(default=0, editable=False)
+    score_9 = models.PositiveIntegerField(default=0, editable=False)
+    score_10 = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Заполняется триггером базы, см. reviews.search.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'product'
         verbose_name_plural = 'products'
         ordering = ('id', )
+        # Индекс title_rating_idx для ?ordering=-rating создаёт миграция
+        # 0007_leaderboard: NULLS LAST в индексе SQLite не поддерживает.
 
     def __str__(self):
         return self.name
 
 
-class Review(models.Model):
+class Review(AtomicSaveMixin, models.Model):
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
@@ -125,6 +242,7 @@ class Review(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
@@ -133,6 +251,10 @@ class Review(models.Model):
                 name='unique review'
             )
         ]
+        indexes = [
+            models.Index(fields=['title', '-pub_date', '-id'],
+                         name='review_title_pub_date_idx'),
+        ]
         verbose_name = 'Review'
         verbose_name_plural = 'Reviews'
         ordering = ('-pub_date', )
@@ -141,7 +263,7 @@ class Review(models.Model):
         return self.text
 
 
-class Comment(models.Model):
+class Comment(AtomicSaveMixin, models.Model):
     review = models.ForeignKey(
         Review, on_delete=models.CASCADE,
         related_name='comments',
@@ -157,8 +279,13 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name='Pub_date'
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=['review', '-pub_date', '-id'],
+                         name='comment_review_pub_date_idx'),
+        ]
         verbose_name = 'Comment'
         verbose_name_plural = 'Comments'
         ordering = ('-pub_date', )
@@ -173,6 +300,112 @@ class TitleGenre(models.Model):
 
     class Meta:
         ordering = ('id', )
+        indexes = [
+            models.Index(fields=['genre', 'title'],
+                         name='titlegenre_genre_title_idx'),
+        ]
 
     def __str__(self):
         return f'{self.genre} {self.title}'
+
+
+class LeaderboardEntry(models.Model):
+    """Строка таблицы лучших произведений, см. reviews.leaderboard.
+
+    У произведения, набравшего LEADERBOARD['MIN_REVIEWS'] отзывов, есть
+    общая строка (без жанра и категории), строка на каждый его жанр и
+    строка его категории. Каждый рейтинг читается своим частичным
+    индексом в порядке выдачи, поэтому первые N строк стоят O(N).
+    """
+    title = models.ForeignKey(Title, on_delete=models.CASCADE,
+                              related_name='leaderboard_entries')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, null=True,
+                              related_name='+', db_index=False)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE,
+                                 null=True, related_name='+', db_index=False)
+    rating = models.PositiveSmallIntegerField()
+    reviews_count = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ('-rating', '-reviews_count', 'title')
+        indexes = [
+            models.Index(fields=['-rating', '-reviews_count', 'title'],
+                         condition=models.Q(genre__isnull=True,
+                                            category__isnull=True),
+                         name='leaderboard_overall_idx'),
+            models.Index(fields=['genre', '-rating', '-reviews_count',
+                                 'title'],
+                         condition=models.Q(genre__isnull=False),
+                         name='leaderboard_genre_idx'),
+            models.Index(fields=['category', '-rating', '-reviews_count',
+                                 'title'],
+                         condition=models.Q(category__isnull=False),
+                         name='leaderboard_category_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.title_id}: {self.rating}'
+
+
+class OutboxEmail(models.Model):
+    """Письмо, которое отправит команда send_outbox.
+
+    Пишется в той же транзакции, что и данные, ради которых отправляется,
+    поэтому запрос не ждёт почтовый сервер.
+    """
+    recipient = models.EmailField(max_length=254)
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    from_email = models.EmailField(max_length=254)
+    created = models.DateTimeField(auto_now_add=True)
+    send_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sent = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('send_after', 'id')
+        indexes = [
+            models.Index(fields=['send_after', 'id'],
+                         condition=models.Q(sent__isnull=True),
+                         name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
+
+
+class ChangeAction:
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+
+
+CHANGE_ACTION_CHOICES = (
+    (ChangeAction.CREATED, 'Создан'),
+    (ChangeAction.UPDATED, 'Изменён'),
+    (ChangeAction.DELETED, 'Удалён'),
+)
+
+
+class ChangeEvent(models.Model):
+    """Запись ленты изменений /api/v1/changes/, см. reviews.changes.
+
+    id растёт монотонно и служит курсором ленты. Запись об удалении
+    (tombstone) хранит key удалённого объекта, сам объект уже не найти.
+    """
+    resource = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    # Поля, по которым объект находится в API: id, slug, title_id...
+    key = models.JSONField()
+    action = models.CharField(max_length=10, choices=CHANGE_ACTION_CHOICES)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['created'], name='changeevent_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.id}: {self.action} {self.resource} {self.object_id}'
@@ -0,0 +1,78 @@
+"""Очередь исходящих писем, см. модель OutboxEmail."""
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+RETRY_DELAY = 60
+MAX_RETRY_DELAY = 60 * 60
+
+
+def enqueue(recipient, subject, message, from_email):
+    return OutboxEmail.objects.create(
+        recipient=recipient, subject=subject,
+        message=message, from_email=from_email,
+    )
+
+
+def get_retry_delay(attempts):
+    """Пауза перед повтором растёт вдвое с каждой неудачей."""
+    return timedelta(
+        seconds=min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    )
+
+
+def mark_failed(email, error, now):
+    email.attempts += 1
+    email.last_error = repr(error)
+    email.send_after = now + get_retry_delay(email.attempts)
+
+
+def send_pending(batch_size, max_attempts):
+    """Отправляет одну пачку писем, возвращает (отправлено, с ошибкой).
+
+    Строки блокируются с SKIP LOCKED, поэтому несколько обработчиков
+    могут работать одновременно и не отправят письмо дважды.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                sent__isnull=True, send_after__lte=now,
+                attempts__lt=max_attempts,
+            )[:batch_size]
+        )
+        if not emails:
+            return 0, 0
+        failed = 0
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as error:
+            # Почтовый сервер недоступен: повтор всей пачки откладывается,
+            # а обработчик продолжает работать.
+            for email in emails:
+                mark_failed(email, error, now)
+            failed = len(emails)
+        else:
+            try:
+                for email in emails:
+                    try:
+                        EmailMessage(
+                            email.subject, email.message, email.from_email,
+                            [email.recipient], connection=connection,
+                        ).send()
+                    except Exception as error:
+                        failed += 1
+                        mark_failed(email, error, now)
+                    else:
+                        email.sent = timezone.now()
+            finally:
+                connection.close()
+        OutboxEmail.objects.bulk_update(
+            emails, ('attempts', 'last_error', 'send_after', 'sent')
+        )
+    return len(emails) - failed, failed
@@ -0,0 +1,94 @@
+"""Полнотекстовый поиск по названию и описанию произведений.
+
+На PostgreSQL колонку reviews_title.search_vector заполняет триггер
+(см. миграцию 0004_title_search), по ней построен GIN-индекс. На SQLite
+используется таблица FTS5, которую обновляют сигналы reviews.signals.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'reviews_title_fts'
+FTS_MATCH_SQL = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+# Название весит больше описания, bm25 тем меньше, чем лучше совпадение.
+FTS_RANK_SQL = (
+    f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+    f'WHERE {FTS_TABLE} MATCH %s AND rowid = reviews_title.id'
+)
+
+
+def to_fts_query(text):
+    """Слова запроса в кавычках: спецсимволы FTS5 не доходят до MATCH."""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', text))
+
+
+def postgres_search(queryset, text):
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    return queryset.annotate(
+        rank=SearchRank(F('search_vector'), query)
+    ).filter(search_vector=query)
+
+
+def sqlite_search(queryset, text):
+    query = to_fts_query(text)
+    if not query:
+        return queryset.none()
+    return queryset.filter(
+        id__in=RawSQL(FTS_MATCH_SQL, (query,))
+    ).annotate(
+        rank=RawSQL(FTS_RANK_SQL, (query,), output_field=FloatField())
+    )
+
+
+def search(queryset, text):
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        queryset = postgres_search(queryset, text)
+    elif vendor == 'sqlite':
+        queryset = sqlite_search(queryset, text)
+    else:
+        queryset = queryset.filter(name__icontains=text).annotate(
+            rank=RawSQL('0', (), output_field=FloatField())
+        )
+    return queryset.order_by('-rank', 'id')
+
+
+def index_titles(titles, using):
+    """Переписывает строки FTS5 для произведений (только SQLite)."""
+    if connections[using].vendor != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(title.id,) for title in titles],
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+            'VALUES (%s, %s, %s)',
+            [(title.id, title.name, title.description or '')
+             for title in titles],
+        )
+
+
+def unindex_title(title_id, using):
+    if connections[using].vendor != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       (title_id,))
+
+
+def rebuild_index(using):
+    """Заполняет FTS5 заново, нужно после пачечной вставки (SQLite)."""
+    if connections[using].vendor != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description) '
+            "SELECT id, name, COALESCE(description, '') FROM reviews_title"
+        )
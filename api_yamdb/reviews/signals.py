@@ -0,0 +1,98 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save)
+from django.dispatch import receiver
+
+from . import changes, leaderboard
+from .models import ChangeAction, LeaderboardEntry, Review, Title
+from .search import index_titles, unindex_title
+
+
+@receiver(post_init, sender=Review)
+def remember_score(sender, instance, **kwargs):
+    # Отложенное поле не трогаем, иначе post_init сделает лишний запрос.
+    instance._saved_score = instance.__dict__.get('score')
+
+
+@receiver(post_save, sender=Review)
+def add_review_score(sender, instance, created, using, **kwargs):
+    titles = Title.objects.filter(pk=instance.title_id)
+    if created:
+        titles.apply_review_delta({instance.score: 1})
+        leaderboard.update_title(instance.title_id, 1, using)
+    elif instance._saved_score is None:
+        titles.refresh_ratings()
+        leaderboard.rebuild_titles([instance.title_id], using)
+    elif instance.score != instance._saved_score:
+        titles.apply_review_delta(
+            {instance.score: 1, instance._saved_score: -1}
+        )
+        leaderboard.update_title(instance.title_id, 0, using)
+    instance._saved_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_score(sender, instance, using, **kwargs):
+    # При каскадном удалении произведения UPDATE просто не найдёт строку.
+    titles = Title.objects.filter(pk=instance.title_id)
+    if instance._saved_score is None:
+        titles.refresh_ratings()
+        leaderboard.rebuild_titles([instance.title_id], using)
+    else:
+        titles.apply_review_delta({instance._saved_score: -1})
+        leaderboard.update_title(instance.title_id, -1, using)
+
+
+@receiver(post_init, sender=Title)
+def remember_category(sender, instance, **kwargs):
+    instance._saved_category_id = instance.__dict__.get('category_id')
+
+
+@receiver(post_save, sender=Title)
+def move_title_category(sender, instance, created, using, **kwargs):
+    # У нового произведения нет отзывов, значит и строк в таблице.
+    if (not created and leaderboard.is_ranked(instance)
+            and instance.category_id != instance._saved_category_id):
+        leaderboard.rebuild_titles([instance.pk], using)
+    instance._saved_category_id = instance.category_id
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def move_title_genres(sender, instance, action, reverse, pk_set, using,
+                      **kwargs):
+    if not action.startswith('post_') or pk_set == set():
+        return
+    if not reverse:
+        if leaderboard.is_ranked(instance):
+            leaderboard.rebuild_titles([instance.pk], using)
+    elif pk_set is not None:
+        leaderboard.rebuild_titles(pk_set, using)
+    else:
+        LeaderboardEntry.objects.using(using).filter(
+            genre_id=instance.pk
+        ).delete()
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, using, **kwargs):
+    index_titles([instance], using)
+
+
+@receiver(post_delete, sender=Title)
+def unindex_deleted_title(sender, instance, using, **kwargs):
+    unindex_title(instance.id, using)
+
+
+def record_saved(sender, instance, created, using, **kwargs):
+    changes.record(
+        [instance], ChangeAction.CREATED if created else ChangeAction.UPDATED,
+        using,
+    )
+
+
+def record_deleted(sender, instance, using, **kwargs):
+    changes.record([instance], ChangeAction.DELETED, using)
+
+
+for model in changes.MODEL_KEYS:
+    post_save.connect(record_saved, sender=model)
+    post_delete.connect(record_deleted, sender=model)
@@ -0,0 +1,44 @@
+import pytest
+
+
+@pytest.fixture
+def category():
+    from reviews.models import Category
+
+    return Category.objects.create(name='Фильм', slug='films')
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Genre
+
+    return [
+        Genre.objects.create(name=f'Жанр {number}', slug=f'genre-{number}')
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def title(category, genres):
+    from reviews.models import Title
+
+    title = Title.objects.create(name='Чудо юдо', year=1999,
+                                 category=category)
+    title.genre.set(genres[:2])
+    return title
+
+
+@pytest.fixture
+def review(title, user):
+    from reviews.models import Review
+
+    return Review.objects.create(title=title, author=user,
+                                 text='Текст отзыва', score=7)
+
+
+@pytest.fixture
+def comment(review, another_user):
+    from reviews.models import Comment
+
+    return Comment.objects.create(review=review, author=another_user,
+                                  text='Текст комментария')
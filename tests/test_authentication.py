@@ -0,0 +1,182 @@
+import pytest
+from api.authentication import clear_stamps, get_access_token
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .fixtures.fixture_user import get_client
+
+
+def get_token_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.mark.django_db
+class TestClaimsAuthentication:
+
+    def test_token_view_embeds_claims(self, guest_client, moderator):
+        response = guest_client.post('/api/v1/auth/token/', data={
+            'username': moderator.username,
+            'confirmation_code': default_token_generator.make_token(
+                moderator
+            ),
+        })
+        assert response.status_code == 200
+        token = AccessToken(response.json()['token'])
+        assert (token['username'], token['role'], token['is_superuser']) == (
+            moderator.username, 'moderator', False
+        )
+
+    def test_permission_check_without_user_query(self, admin_client):
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(
+                '/api/v1/categories/', data={'name': 'Книги', 'slug': 'books'}
+            )
+        assert response.status_code == 201
+        assert not [query for query in context.captured_queries
+                    if 'reviews_user' in query['sql']], (
+            'Проверьте, что роль берётся из токена, а не из базы'
+        )
+
+    def test_me_returns_full_profile(self, user_client, user):
+        user.bio = 'bio'
+        user.save()
+        response = user_client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.json()['email'] == user.email
+
+    @pytest.mark.parametrize('field,value', (
+        ('role', 'admin'), ('is_active', False), ('username', 'Renamed'),
+    ))
+    def test_change_revokes_token(self, user, field, value):
+        client = get_client(user)
+        setattr(user, field, value)
+        user.save()
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 401
+        if value:
+            assert get_client(user).get('/api/v1/users/me/').status_code == 200
+
+    def test_profile_change_keeps_token(self, user, user_client):
+        user.bio = 'bio'
+        user.save()
+        assert user_client.get('/api/v1/users/me/').status_code == 200
+
+    def test_revocation_reaches_other_processes(self, user, settings):
+        settings.API_AUTH = {'USER_TTL': 0}
+        client = get_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        user.role = 'moderator'
+        user.save()
+        # Другой процесс знает об отзыве только из общего кэша.
+        clear_stamps()
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+    def test_revocation_survives_cache_eviction(self, admin, admin_client):
+        from api.authentication import STAMP_KEY
+        from django.core.cache import cache
+
+        admin.role = 'user'
+        admin.save()
+        cache.delete(STAMP_KEY.format(admin.pk))
+        clear_stamps()
+        assert admin_client.get('/api/v1/users/').status_code == 401
+        # Отметка снова прочитана из базы, новый токен действует.
+        assert get_client(admin).get('/api/v1/users/me/').status_code == 200
+
+    def test_evicted_stamp_read_from_db(self, user, user_client):
+        from api.authentication import STAMP_KEY
+        from django.core.cache import cache
+
+        cache.delete(STAMP_KEY.format(user.pk))
+        clear_stamps()
+        assert user_client.get('/api/v1/users/me/').status_code == 200
+
+    def test_token_without_stamp_rejected(self, user):
+        token = get_access_token(user)
+        token['stamp'] = None
+        assert get_token_client(token).get(
+            '/api/v1/users/me/'
+        ).status_code == 401
+
+    def test_token_without_claims_checked_in_db(self, user):
+        client = get_token_client(AccessToken.for_user(user))
+        assert client.get('/api/v1/users/me/').status_code == 200
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+    def test_deleted_user_token_rejected(self, user):
+        token = get_access_token(user)
+        user.delete()
+        assert get_token_client(token).get(
+            '/api/v1/users/me/'
+        ).status_code == 401
+
+
+@pytest.mark.django_db
+class TestTokenRefresh:
+
+    def get_tokens(self, client, user):
+        return client.post('/api/v1/auth/token/', data={
+            'username': user.username,
+            'confirmation_code': default_token_generator.make_token(user),
+        }).json()
+
+    def test_refresh_without_queries(self, guest_client, user):
+        refresh = self.get_tokens(guest_client, user)['refresh']
+        with CaptureQueriesContext(connection) as context:
+            response = guest_client.post('/api/v1/auth/token/refresh/',
+                                         data={'refresh': refresh})
+        assert response.status_code == 200
+        assert len(context) == 0, 'refresh не должен обращаться к базе'
+        assert 'refresh' not in response.json()
+        token = response.json()['token']
+        assert AccessToken(token)['role'] == 'user'
+        assert get_token_client(token).get(
+            '/api/v1/users/me/'
+        ).status_code == 200
+
+    def test_refresh_rejected_after_revocation(self, guest_client, user):
+        refresh = self.get_tokens(guest_client, user)['refresh']
+        user.role = 'admin'
+        user.save()
+        response = guest_client.post('/api/v1/auth/token/refresh/',
+                                     data={'refresh': refresh})
+        assert response.status_code == 401
+
+    @pytest.mark.parametrize('field,value', (
+        ('role', 'user'), ('is_active', False),
+    ))
+    def test_refresh_rejected_after_stamp_eviction(self, guest_client, admin,
+                                                   field, value):
+        from api.authentication import STAMP_KEY
+        from django.core.cache import cache
+
+        refresh = self.get_tokens(guest_client, admin)['refresh']
+        setattr(admin, field, value)
+        admin.save()
+        cache.delete(STAMP_KEY.format(admin.pk))
+        clear_stamps()
+        response = guest_client.post('/api/v1/auth/token/refresh/',
+                                     data={'refresh': refresh})
+        assert response.status_code == 401
+
+    def test_access_token_is_not_refresh(self, guest_client, user):
+        access = self.get_tokens(guest_client, user)['token']
+        response = guest_client.post('/api/v1/auth/token/refresh/',
+                                     data={'refresh': access})
+        assert response.status_code == 401
+
+    def test_rotation(self, guest_client, user, settings):
+        settings.SIMPLE_JWT = {**settings.SIMPLE_JWT,
+                               'ROTATE_REFRESH_TOKENS': True}
+        refresh = self.get_tokens(guest_client, user)['refresh']
+        response = guest_client.post('/api/v1/auth/token/refresh/',
+                                     data={'refresh': refresh})
+        assert response.status_code == 200
+        assert response.json()['refresh'] != refresh
@@ -0,0 +1,71 @@
+import pytest
+
+
+@pytest.fixture
+def titles(category, genres):
+    from reviews.models import Title
+
+    titles = [Title.objects.create(name=f'Произведение {number}', year=2000,
+                                   category=category)
+              for number in range(3)]
+    titles[0].genre.set(genres[:2])
+    return titles
+
+
+@pytest.mark.django_db
+class TestBatchList:
+
+    def test_titles(self, guest_client, titles):
+        ids = [titles[2].id, 999999, titles[0].id, titles[2].id]
+        response = guest_client.get(
+            f'/api/v1/titles/?id__in={",".join(map(str, ids))}'
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data['missing'] == [999999]
+        assert [title['id'] for title in data['results']] == [
+            titles[2].id, titles[0].id
+        ]
+        # Объект такой же, как в обычном списке.
+        listed = guest_client.get('/api/v1/titles/').json()['results']
+        assert data['results'][1] == next(
+            title for title in listed if title['id'] == titles[0].id
+        )
+
+    def test_titles_with_fields_and_filters(self, guest_client, titles):
+        response = guest_client.get(
+            f'/api/v1/titles/?id__in={titles[0].id},{titles[1].id}'
+            f'&genre=genre-0&fields=id,category'
+        )
+        assert response.json() == {
+            'results': [{'id': titles[0].id,
+                         'category': {'name': 'Фильм', 'slug': 'films'}}],
+            'missing': [titles[1].id],
+        }
+
+    def test_reviews(self, guest_client, title, review, another_user):
+        from reviews.models import Review, Title
+
+        other = Review.objects.create(
+            title=Title.objects.create(name='Другое', year=2000),
+            author=another_user, text='.', score=3,
+        )
+        response = guest_client.get(
+            f'/api/v1/titles/{title.id}/reviews/'
+            f'?id__in={review.id},{other.id}'
+        )
+        # Отзыв другого произведения по этому адресу не найти.
+        assert response.json() == {
+            'results': [guest_client.get(
+                f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+            ).json()],
+            'missing': [other.id],
+        }
+
+    @pytest.mark.parametrize('value', ('', 'a,b', '1,-2', ','.join(
+        str(number) for number in range(1, 202)
+    )))
+    def test_bad_ids(self, guest_client, value):
+        response = guest_client.get(f'/api/v1/titles/?id__in={value}')
+        assert response.status_code == 400
+        assert 'id__in' in response.json()
@@ -0,0 +1,98 @@
+import pytest
+from api.cache import get_version
+from reviews.models import Category, Genre, Title
+
+
+@pytest.mark.django_db
+class TestBulkCreate:
+
+    def test_titles(self, admin_client, category, genres):
+        items = [
+            {'name': f'Произведение {number}', 'year': 2000,
+             'category': 'films', 'genre': ['genre-0', 'genre-1']}
+            for number in range(3)
+        ]
+        response = admin_client.post('/api/v1/titles/bulk/', data=items,
+                                     format='json')
+        assert response.status_code == 201
+        single = admin_client.post('/api/v1/titles/', data=items[0],
+                                   format='json').json()
+        created = response.json()
+        assert [{**item, 'id': None} for item in created] == [
+            {**single, 'id': None, 'name': item['name']} for item in items
+        ], 'Ответ должен совпадать с ответом на одиночное создание'
+        title = Title.objects.get(id=created[2]['id'])
+        assert sorted(title.genre.values_list('slug', flat=True)) == [
+            'genre-0', 'genre-1'
+        ]
+
+    def test_partial_errors(self, admin_client, category, genres):
+        items = [
+            {'name': 'Правильное', 'year': 2000,
+             'category': 'films', 'genre': ['genre-0']},
+            {'name': 'Без категории', 'year': 2000,
+             'category': 'nope', 'genre': ['genre-0']},
+            {'name': 'Из будущего', 'year': 3000,
+             'category': 'films', 'genre': ['genre-9']},
+        ]
+        response = admin_client.post('/api/v1/titles/bulk/', data=items,
+                                     format='json')
+        assert response.status_code == 207
+        data = response.json()
+        assert data['results'][0]['name'] == 'Правильное'
+        assert data['results'][1:] == [None, None]
+        assert data['errors'][0] == {}
+        assert set(data['errors'][1]) == {'category'}
+        assert set(data['errors'][2]) == {'year', 'genre'}
+        assert Title.objects.get().name == 'Правильное'
+
+    def test_atomic(self, admin_client, category):
+        items = [{'name': 'Книги', 'slug': 'books'},
+                 {'name': 'Книги', 'slug': 'films'}]
+        response = admin_client.post('/api/v1/categories/bulk/?atomic=true',
+                                     data=items, format='json')
+        assert response.status_code == 400
+        assert response.json()[0] == {}
+        assert set(response.json()[1]) == {'name', 'slug'}
+        assert Category.objects.count() == 1
+
+    def test_duplicates_inside_batch(self, admin_client):
+        items = [{'name': 'Драма', 'slug': 'drama'},
+                 {'name': 'Драма', 'slug': 'drama-2'},
+                 {'name': 'Комедия', 'slug': 'comedy'}]
+        response = admin_client.post('/api/v1/genres/bulk/', data=items,
+                                     format='json')
+        assert response.status_code == 207
+        assert set(response.json()['errors'][1]) == {'name'}
+        assert sorted(Genre.objects.values_list('slug', flat=True)) == [
+            'comedy', 'drama'
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalidates_cache(self, guest_client, admin_client):
+        assert guest_client.get('/api/v1/genres/').json()['count'] == 0
+        admin_client.post('/api/v1/genres/bulk/', format='json',
+                          data=[{'name': 'Драма', 'slug': 'drama'}])
+        assert guest_client.get('/api/v1/genres/').json()['count'] == 1
+
+    def test_failed_batch_keeps_cache(self, admin_client,
+                                      django_capture_on_commit_callbacks):
+        version = get_version('genres')
+        with django_capture_on_commit_callbacks(execute=True):
+            response = admin_client.post('/api/v1/genres/bulk/',
+                                         format='json',
+                                         data=[{'name': 'Драма'}])
+        assert response.status_code == 207
+        assert get_version('genres') == version
+
+    @pytest.mark.parametrize('data', ({'name': 'Драма'}, [{}] * 1001))
+    def test_bad_payload(self, admin_client, data):
+        response = admin_client.post('/api/v1/genres/bulk/', data=data,
+                                     format='json')
+        assert response.status_code == 400
+        assert 'non_field_errors' in response.json()
+
+    def test_admin_only(self, user_client):
+        response = user_client.post('/api/v1/genres/bulk/', format='json',
+                                    data=[{'name': 'Драма', 'slug': 'drama'}])
+        assert response.status_code == 403
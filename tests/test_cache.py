@@ -0,0 +1,79 @@
+import pytest
+from api.cache import get_stats, get_version
+from reviews.models import Genre, Review
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_anonymous_list_is_cached(self, guest_client, title,
+                                      django_assert_num_queries):
+        response = guest_client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS'
+        with django_assert_num_queries(0):
+            cached = guest_client.get('/api/v1/titles/')
+        assert cached['X-Cache'] == 'HIT'
+        assert cached.json() == response.json()
+        assert get_stats('titles') == {'hit': 1, 'miss': 1}
+
+    def test_query_params_are_normalized(self, guest_client, title):
+        guest_client.get('/api/v1/titles/?year=1999&limit=5')
+        response = guest_client.get('/api/v1/titles/?limit=5&year=1999')
+        assert response['X-Cache'] == 'HIT'
+        response = guest_client.get('/api/v1/titles/?limit=5&year=2000')
+        assert response['X-Cache'] == 'MISS'
+
+    def test_authenticated_requests_bypass_cache(self, user_client, title):
+        user_client.get('/api/v1/titles/')
+        response = user_client.get('/api/v1/titles/')
+        assert 'X-Cache' not in response
+
+    @pytest.mark.django_db(transaction=True)
+    def test_review_write_invalidates_titles_and_reviews(
+        self, guest_client, user_client, title
+    ):
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        title_url = f'/api/v1/titles/{title.id}/'
+        assert guest_client.get(title_url).json()['rating'] is None
+        assert guest_client.get(reviews_url).json()['count'] == 0
+
+        response = user_client.post(reviews_url,
+                                    {'text': 'Отзыв', 'score': 8})
+        assert response.status_code == 201
+        assert guest_client.get(title_url).json()['rating'] == 8
+        assert guest_client.get(reviews_url).json()['count'] == 1
+
+        Review.objects.all().delete()
+        assert guest_client.get(title_url).json()['rating'] is None
+
+    def test_version_bumped_after_commit(
+        self, guest_client, title, django_capture_on_commit_callbacks
+    ):
+        version = get_version('titles')
+        with django_capture_on_commit_callbacks(execute=True):
+            title.name = 'Другое'
+            title.save()
+            # Запрос до фиксации видит старые строки и не должен
+            # сохранить их под новой версией.
+            assert get_version('titles') == version
+            guest_client.get(f'/api/v1/titles/{title.id}/')
+        assert get_version('titles') != version
+        response = guest_client.get(f'/api/v1/titles/{title.id}/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['name'] == 'Другое'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_genre_changes_invalidate_titles(self, guest_client, title,
+                                             genres):
+        url = f'/api/v1/titles/{title.id}/'
+        guest_client.get(url)
+        title.genre.set(genres)
+        assert len(guest_client.get(url).json()['genre']) == 3
+        Genre.objects.filter(pk=genres[0].pk).get().delete()
+        assert len(guest_client.get(url).json()['genre']) == 2
+
+    def test_categories_and_genres_lists_are_cached(self, guest_client,
+                                                    category, genres):
+        for url in ('/api/v1/categories/', '/api/v1/genres/'):
+            guest_client.get(url)
+            assert guest_client.get(url)['X-Cache'] == 'HIT'
@@ -0,0 +1,171 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+
+def get_events(since=0):
+    from reviews.models import ChangeEvent
+
+    return [
+        (event.resource, event.action, event.key)
+        for event in ChangeEvent.objects.filter(id__gt=since)
+    ]
+
+
+def get_last_id():
+    from reviews.models import ChangeEvent
+
+    return ChangeEvent.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+
+
+def settled():
+    """created события, пропуск перед которым уже считается откатом."""
+    from reviews.changes import get_setting
+
+    return timezone.now() - timedelta(seconds=get_setting('GAP_TIMEOUT') + 1)
+
+
+@pytest.mark.django_db
+class TestChangeEvents:
+
+    def test_saves_and_tombstones(self, comment):
+        review = comment.review
+        title = review.title
+        assert get_events() == [
+            ('categories', 'created', {'id': title.category_id,
+                                       'slug': 'films'}),
+            *[('genres', 'created', {'id': genre.id, 'slug': genre.slug})
+              for genre in title.genre.model.objects.all()],
+            ('titles', 'created', {'id': title.id}),
+            ('reviews', 'created', {'id': review.id, 'title_id': title.id}),
+            ('comments', 'created', {'id': comment.id,
+                                     'review_id': review.id}),
+        ]
+        since = get_last_id()
+        # Счётчики отзывов в объекте из фикстуры устарели.
+        title = title.__class__.objects.get(pk=title.pk)
+        updated_at = title.updated_at
+        title.name = 'Другое'
+        title.save()
+        assert title.updated_at > updated_at
+        title_id = title.id
+        title.delete()
+        # Отзывы и комментарии удаляются каскадом, но тоже получают
+        # запись об удалении.
+        assert get_events(since) == [
+            ('titles', 'updated', {'id': title_id}),
+            ('comments', 'deleted', {'id': comment.id,
+                                     'review_id': review.id}),
+            ('reviews', 'deleted', {'id': review.id, 'title_id': title_id}),
+            ('titles', 'deleted', {'id': title_id}),
+        ]
+
+    def test_bulk_create(self, admin_client, category, genres):
+        since = get_last_id()
+        response = admin_client.post('/api/v1/genres/bulk/', [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'},
+        ], format='json')
+        assert response.status_code == 201
+        assert [(resource, action, key['slug'])
+                for resource, action, key in get_events(since)] == [
+            ('genres', 'created', 'drama'),
+            ('genres', 'created', 'comedy'),
+        ]
+
+    def test_prune(self, title):
+        from reviews.models import ChangeEvent
+
+        ChangeEvent.objects.filter(resource='titles').update(
+            created=timezone.now() - timedelta(days=31)
+        )
+        call_command('prune_changes', verbosity=0)
+        assert 'titles' not in {event[0] for event in get_events()}
+        assert get_events()
+
+
+@pytest.mark.django_db
+class TestChangesApi:
+
+    def test_pages(self, admin_client, review):
+        total = len(get_events())
+        results = []
+        url = '/api/v1/changes/?limit=2'
+        while url:
+            response = admin_client.get(url)
+            assert response.status_code == 200
+            data = response.json()
+            results += data['results']
+            url = data['next']
+        assert len(results) == total
+        assert [event['id'] for event in results] == sorted(
+            event['id'] for event in results
+        )
+        assert set(results[-1]) == {'id', 'resource', 'action', 'key',
+                                    'updated_at'}
+
+        cursor = data['cursor']
+        assert cursor == results[-1]['id']
+        response = admin_client.get(f'/api/v1/changes/?since={cursor}')
+        assert response.json() == {'cursor': cursor, 'next': None,
+                                   'results': []}
+        review.delete()
+        response = admin_client.get(f'/api/v1/changes/?since={cursor}')
+        assert [(event['resource'], event['action'])
+                for event in response.json()['results']] == [
+            ('reviews', 'deleted')
+        ]
+
+    def test_waits_for_fresh_gap(self, admin_client, title):
+        from reviews.models import ChangeEvent
+
+        since = get_last_id()
+        # Событие с id since + 1 ещё в незавершённой транзакции.
+        ChangeEvent.objects.create(id=since + 2, resource='titles',
+                                   object_id=title.id, action='updated',
+                                   key={'id': title.id})
+        response = admin_client.get(f'/api/v1/changes/?since={since}')
+        assert response.json()['results'] == []
+        assert response.json()['cursor'] == since
+
+        ChangeEvent.objects.filter(id=since + 2).update(created=settled())
+        response = admin_client.get(f'/api/v1/changes/?since={since}')
+        assert [event['id'] for event in response.json()['results']] == [
+            since + 2
+        ]
+
+    def test_event_later_than_timeout_is_lost(self, admin_client, title):
+        from reviews.models import ChangeEvent
+
+        since = get_last_id()
+        ChangeEvent.objects.create(id=since + 2, resource='titles',
+                                   object_id=title.id, action='updated',
+                                   key={'id': title.id}, created=settled())
+        cursor = admin_client.get(
+            f'/api/v1/changes/?since={since}'
+        ).json()['cursor']
+        assert cursor == since + 2
+        # Транзакция с id since + 1 завершилась после GAP_TIMEOUT.
+        ChangeEvent.objects.create(id=since + 1, resource='titles',
+                                   object_id=title.id, action='deleted',
+                                   key={'id': title.id})
+        response = admin_client.get(f'/api/v1/changes/?since={cursor}')
+        assert response.json()['results'] == []
+
+    @pytest.mark.parametrize('client_name, status_code', (
+        ('guest_client', 401), ('user_client', 403),
+        ('moderator_client', 403),
+    ))
+    def test_admin_only(self, request, client_name, status_code):
+        client = request.getfixturevalue(client_name)
+        assert client.get('/api/v1/changes/').status_code == status_code
+
+    @pytest.mark.parametrize('query', ('?since=-1', '?limit=0',
+                                       '?limit=1001', '?since=abc'))
+    def test_bad_params(self, admin_client, query):
+        response = admin_client.get(f'/api/v1/changes/{query}')
+        assert response.status_code == 400
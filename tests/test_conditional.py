@@ -0,0 +1,50 @@
+import pytest
+from reviews.models import Comment
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def test_etag_not_modified(self, guest_client, title,
+                               django_assert_num_queries):
+        url = f'/api/v1/titles/{title.id}/'
+        response = guest_client.get(url)
+        assert response.status_code == 200
+        etag = response['ETag']
+        assert etag.startswith('"'), 'ETag должен быть сильным'
+        with django_assert_num_queries(0):
+            response = guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+
+    @pytest.mark.django_db(transaction=True)
+    def test_etag_changes_after_write(self, guest_client, user_client,
+                                      title):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = guest_client.get(url)['ETag']
+        user_client.post(url, {'text': 'Отзыв', 'score': 3})
+        response = guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert response.json()['count'] == 1
+
+    def test_etag_differs_between_pages(self, guest_client, title):
+        first = guest_client.get('/api/v1/titles/?limit=1')['ETag']
+        second = guest_client.get('/api/v1/titles/?limit=2')['ETag']
+        assert first != second
+
+    @pytest.mark.django_db(transaction=True)
+    def test_if_modified_since(self, user_client, review, comment):
+        url = (f'/api/v1/titles/{review.title_id}/reviews/{review.id}'
+               '/comments/')
+        last_modified = user_client.get(url)['Last-Modified']
+        response = user_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+        # Запись в ту же секунду, что и предыдущая.
+        Comment.objects.create(review=review, author=review.author,
+                               text='Ещё')
+        response = user_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 200
+        assert response.json()['count'] == 2
+        assert response['Last-Modified'] != last_modified
@@ -0,0 +1,64 @@
+import csv
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from reviews.models import Title
+
+
+def get_content(response):
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.fixture
+def catalogue(title, review, category):
+    other = Title.objects.create(name='Без жанров', year=1990)
+    return [
+        {'id': title.id, 'name': 'Чудо юдо', 'year': 1999,
+         'description': None, 'category': 'films',
+         'genre': ['genre-0', 'genre-1'], 'rating': review.score},
+        {'id': other.id, 'name': 'Без жанров', 'year': 1990,
+         'description': None, 'category': None, 'genre': [], 'rating': None},
+    ]
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_ndjson(self, admin_client, catalogue):
+        response = admin_client.get('/api/v1/titles/export/')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        assert response.streaming
+        lines = get_content(response).splitlines()
+        assert [json.loads(line) for line in lines] == catalogue
+
+    def test_csv(self, admin_client, catalogue):
+        response = admin_client.get('/api/v1/titles/export/?format=csv')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/csv')
+        rows = list(csv.DictReader(StringIO(get_content(response))))
+        assert [row['id'] for row in rows] == [
+            str(title['id']) for title in catalogue
+        ]
+        assert rows[0]['genre'] == 'genre-0,genre-1'
+        assert rows[1]['category'] == ''
+
+    @pytest.mark.parametrize('client_name,status', (
+        ('guest_client', 401), ('user_client', 403),
+    ))
+    def test_admin_only(self, request, client_name, status):
+        client = request.getfixturevalue(client_name)
+        assert client.get('/api/v1/titles/export/').status_code == status
+
+    def test_command(self, catalogue, tmp_path):
+        stdout = StringIO()
+        call_command('export_titles', chunk_size=1, stdout=stdout)
+        assert [json.loads(line)
+                for line in stdout.getvalue().splitlines()] == catalogue
+
+        output = tmp_path / 'titles.csv'
+        call_command('export_titles', format='csv', output=output)
+        with open(output, encoding='utf-8', newline='') as file:
+            assert len(list(csv.DictReader(file))) == len(catalogue)
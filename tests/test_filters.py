@@ -0,0 +1,69 @@
+import pytest
+from reviews.models import Title
+
+
+@pytest.fixture
+def catalogue(category, genres):
+    drama, comedy, thriller = genres
+    titles = {
+        'drama': Title.objects.create(name='Драма', year=2000,
+                                      category=category),
+        'both': Title.objects.create(name='Обе', year=2000,
+                                     category=category),
+        'comedy': Title.objects.create(name='Комедия', year=2000),
+    }
+    titles['drama'].genre.set([drama])
+    titles['both'].genre.set([drama, comedy, thriller])
+    titles['comedy'].genre.set([comedy])
+    return titles
+
+
+def names(client, **params):
+    response = client.get('/api/v1/titles/', params)
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestTitleFilters:
+
+    def test_genre_exact(self, guest_client, catalogue):
+        assert names(guest_client, genre='genre-0') == ['Драма', 'Обе']
+        assert names(guest_client, genre='genre') == []
+
+    def test_genre_any_without_duplicates(self, guest_client, catalogue):
+        assert names(guest_client, genre='genre-0,genre-1') == [
+            'Драма', 'Обе', 'Комедия'
+        ]
+
+    def test_genre_all(self, guest_client, catalogue):
+        assert names(guest_client, genre='genre-0,genre-1',
+                     genre_mode='all') == ['Обе']
+        assert names(guest_client, genre='genre-0,missing',
+                     genre_mode='all') == []
+
+    def test_genre_mode_is_validated(self, guest_client, catalogue):
+        response = guest_client.get('/api/v1/titles/',
+                                    {'genre': 'genre-0', 'genre_mode': 'x'})
+        assert response.status_code == 400
+
+    def test_category(self, guest_client, catalogue):
+        assert names(guest_client, category='films') == ['Драма', 'Обе']
+        assert names(guest_client, category='film') == []
+        assert names(guest_client, category='films,books') == [
+            'Драма', 'Обе'
+        ]
+
+    def test_legacy_contains(self, guest_client, catalogue):
+        assert names(guest_client, genre__contains='genre') == [
+            'Драма', 'Обе', 'Комедия'
+        ]
+        assert names(guest_client, category__contains='film') == [
+            'Драма', 'Обе'
+        ]
+
+    def test_filter_keeps_query_budget(self, guest_client, catalogue,
+                                       django_assert_num_queries):
+        with django_assert_num_queries(3):
+            names(guest_client, genre='genre-0,genre-1', genre_mode='all',
+                  category='films')
@@ -0,0 +1,66 @@
+import pytest
+
+
+@pytest.fixture
+def reviews(title, review, comment, another_user, admin):
+    """Три отзыва, у первого комментарий из фикстуры и ещё один."""
+    from reviews.models import Comment, Review
+
+    Comment.objects.create(review=review, author=admin, text='.')
+    return [review] + [
+        Review.objects.create(title=title, author=author, text='.', score=5)
+        for author in (another_user, admin)
+    ]
+
+
+@pytest.mark.django_db
+class TestIncludeReviews:
+
+    def test_embeds_latest_reviews(self, guest_client, title, reviews):
+        url = f'/api/v1/titles/{title.id}/'
+        response = guest_client.get(f'{url}?include=reviews')
+        assert response.status_code == 200
+        data = response.json()
+        included = data.pop('reviews')
+        assert data == guest_client.get(url).json()
+        assert [review['id'] for review in included] == [
+            review.id for review in reversed(reviews)
+        ]
+        assert included[-1] == {
+            **guest_client.get(
+                f'{url}reviews/{reviews[0].id}/'
+            ).json(),
+            'comments_count': 2,
+        }
+        assert [review['comments_count'] for review in included] == [0, 0, 2]
+
+    def test_limit(self, guest_client, title, reviews, monkeypatch):
+        from api.views import TitleViewSet
+
+        monkeypatch.setattr(TitleViewSet, 'included_reviews_count', 2)
+        response = guest_client.get(f'/api/v1/titles/{title.id}/'
+                                    f'?include=reviews&fields=id,reviews')
+        data = response.json()
+        assert set(data) == {'id', 'reviews'}
+        assert [review['id'] for review in data['reviews']] == [
+            reviews[2].id, reviews[1].id
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cache_follows_comments(self, guest_client, title, reviews,
+                                    user):
+        from reviews.models import Comment
+
+        url = f'/api/v1/titles/{title.id}/?include=reviews'
+        assert guest_client.get(url).json()['reviews'][0][
+            'comments_count'
+        ] == 0
+        Comment.objects.create(review=reviews[2], author=user, text='.')
+        response = guest_client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        assert response.json()['reviews'][0]['comments_count'] == 1
+
+    def test_unknown_include(self, guest_client, title):
+        response = guest_client.get(f'/api/v1/titles/{title.id}/'
+                                    f'?include=comments')
+        assert response.status_code == 400
@@ -0,0 +1,121 @@
+import gzip
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from reviews.management.commands.export_db import TRACKING_FIELDS
+from reviews.management.commands.export_db import Command as ExportCommand
+from reviews.management.commands.load_db import FILES_MODELS, Command
+from reviews.models import Category, Comment, Review, Title, User
+
+FILES = {
+    'users.csv': (
+        'id,username,email,role,bio,first_name,last_name\n'
+        '100,bingobongo,bingobongo@yamdb.fake,user,,,\n'
+        '101,"quoted ""name""",q@yamdb.fake,moderator,"bio, comma",Иван,\n'
+    ),
+    'category.csv': 'id,name,slug\n1,Фильм,movie\n2,Книга,book\n',
+    'genre.csv': 'id,name,slug\n1,Драма,drama\n2,Комедия,comedy\n',
+    'titles.csv': 'id,name,year,category\n1,Побег,1994,1\n2,Война,1869,\n',
+    'genre_title.csv': 'id,title_id,genre_id\n1,1,1\n2,1,2\n3,2,1\n',
+    'review.csv': (
+        'id,title_id,text,author,score,pub_date\n'
+        '1,1,Хорошо,100,10,2019-09-24T21:08:21.567Z\n'
+        '2,1,Плохо,101,5,2019-09-25T21:08:21.567Z\n'
+        '3,2,Ок,100,3,2019-09-26T21:08:21.567Z\n'
+    ),
+    'comments.csv': (
+        'id,review_id,text,author,pub_date\n'
+        '1,1,Согласен,101,2019-09-24T21:08:21.567Z\n'
+    ),
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for name, content in FILES.items():
+        (tmp_path / name).write_text(content, encoding='utf-8')
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestLoadDb:
+
+    @pytest.mark.parametrize('use_copy', (
+        pytest.param(True, marks=pytest.mark.skipif(
+            connection.vendor != 'postgresql',
+            reason='COPY есть только в PostgreSQL',
+        )),
+        False,
+    ))
+    def test_load_db(self, data_dir, monkeypatch, use_copy):
+        if not use_copy:
+            monkeypatch.setattr(Command, 'copy_batch', Command.create_batch)
+        call_command('load_db', data_dir=data_dir, batch_size=2,
+                     verbosity=0)
+
+        user = User.objects.get(pk=101)
+        assert (user.username, user.bio, user.last_name) == (
+            'quoted "name"', 'bio, comma', ''
+        )
+        assert Title.objects.get(pk=2).category is None
+        assert list(Title.objects.get(pk=1).genre.values_list(
+            'slug', flat=True)) == ['drama', 'comedy']
+        assert Review.objects.get(pk=1).pub_date.year == 2019, (
+            'Проверьте, что дата публикации берётся из файла'
+        )
+        assert Comment.objects.get().author_id == 101
+        assert Title.objects.values_list('rating', 'reviews_count').get(
+            pk=1) == (7, 2)
+        assert Category.objects.create(name='Музыка', slug='music').pk == 3, (
+            'Проверьте, что последовательности id сброшены после загрузки'
+        )
+
+    def test_load_db_truncate(self, data_dir, category):
+        call_command('load_db', data_dir=data_dir, truncate=True,
+                     verbosity=0)
+        assert not Category.objects.filter(slug=category.slug).exists()
+        assert Category.objects.count() == 2
+
+
+def get_state():
+    # Служебные поля load_db ставит свои.
+    return {
+        model.__name__: list(model.objects.order_by('pk').values(*[
+            field.attname for field in model._meta.concrete_fields
+            if field.name not in TRACKING_FIELDS
+        ]))
+        for model in FILES_MODELS.values()
+    }
+
+
+# Снимок REPEATABLE READ и TRUNCATE после вставки нельзя выполнить
+# внутри транзакции теста.
+@pytest.mark.django_db(transaction=True)
+class TestExportDb:
+
+    @pytest.mark.parametrize('use_copy', (True, False))
+    @pytest.mark.parametrize('compress', (True, False))
+    def test_round_trip(self, data_dir, tmp_path, monkeypatch,
+                        use_copy, compress):
+        if not use_copy:
+            monkeypatch.setattr(ExportCommand, 'copy_table',
+                                ExportCommand.write_rows)
+        call_command('load_db', data_dir=data_dir, verbosity=0)
+        state = get_state()
+        dump_dir = tmp_path / 'dump'
+        call_command('export_db', data_dir=dump_dir, gzip=compress,
+                     verbosity=0)
+
+        name = 'category.csv.gz' if compress else 'category.csv'
+        opener = gzip.open if compress else open
+        with opener(dump_dir / name, 'rt', encoding='utf-8') as file:
+            assert file.read().splitlines() == FILES[
+                'category.csv'
+            ].splitlines()
+
+        call_command('load_db', data_dir=dump_dir, truncate=True,
+                     verbosity=0)
+        assert get_state() == state, (
+            'Проверьте, что load_db загружает выгрузку export_db без потерь'
+        )
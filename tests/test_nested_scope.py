@@ -0,0 +1,19 @@
+import pytest
+from reviews.models import Title
+
+
+@pytest.mark.django_db
+class TestNestedScope:
+
+    def test_foreign_review_is_not_found(self, guest_client, review,
+                                         category, comment):
+        other = Title.objects.create(name='Другое', year=2000)
+        base = f'/api/v1/titles/{other.id}/reviews/{review.id}'
+        assert guest_client.get(f'{base}/').status_code == 404
+        assert guest_client.get(f'{base}/comments/').status_code == 404
+        assert guest_client.get(
+            f'{base}/comments/{comment.id}/'
+        ).status_code == 404
+
+    def test_missing_title_reviews_not_found(self, guest_client):
+        assert guest_client.get('/api/v1/titles/0/reviews/').status_code == 404
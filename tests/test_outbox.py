@@ -0,0 +1,88 @@
+import pytest
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.utils import timezone
+from reviews.models import OutboxEmail
+
+
+def signup(client, username='newbie'):
+    return client.post('/api/v1/auth/signup/', data={
+        'username': username, 'email': f'{username}@yamdb.fake',
+    })
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def test_signup_only_enqueues(self, guest_client):
+        response = signup(guest_client)
+        assert response.status_code == 200
+        assert mail.outbox == [], (
+            'Проверьте, что signup не отправляет письмо внутри запроса'
+        )
+        email = OutboxEmail.objects.get()
+        assert email.recipient == 'newbie@yamdb.fake'
+        assert email.sent is None
+
+    def test_send_outbox(self, guest_client):
+        signup(guest_client, 'first')
+        signup(guest_client, 'second')
+        call_command('send_outbox', batch_size=1, verbosity=0)
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            'first@yamdb.fake', 'second@yamdb.fake'
+        ]
+        assert 'Ваш код' in mail.outbox[0].body
+        assert not OutboxEmail.objects.filter(sent__isnull=True).exists()
+
+        call_command('send_outbox', verbosity=0)
+        assert len(mail.outbox) == 2, 'Письмо не должно уходить дважды'
+
+    def test_failed_email_retried_later(self, guest_client, monkeypatch):
+        signup(guest_client)
+
+        def fail(message):
+            raise ConnectionError('SMTP недоступен')
+
+        monkeypatch.setattr(EmailMessage, 'send', fail)
+        call_command('send_outbox', verbosity=0)
+        email = OutboxEmail.objects.get()
+        assert email.attempts == 1
+        assert email.sent is None
+        assert 'SMTP' in email.last_error
+        assert email.send_after > timezone.now()
+
+        monkeypatch.undo()
+        call_command('send_outbox', verbosity=0)
+        assert mail.outbox == [], 'Повтор должен ждать send_after'
+        OutboxEmail.objects.update(send_after=timezone.now())
+        call_command('send_outbox', verbosity=0)
+        assert len(mail.outbox) == 1
+
+    def test_unreachable_server_backs_off(self, guest_client, monkeypatch):
+        from django.core.mail.backends.locmem import EmailBackend
+
+        signup(guest_client, 'first')
+        signup(guest_client, 'second')
+
+        def refuse(self):
+            raise ConnectionRefusedError(111, 'Connection refused')
+
+        monkeypatch.setattr(EmailBackend, 'open', refuse)
+        call_command('send_outbox', verbosity=0)
+        assert mail.outbox == []
+        for email in OutboxEmail.objects.all():
+            assert email.attempts == 1
+            assert 'Connection refused' in email.last_error
+            assert email.send_after > timezone.now()
+
+        monkeypatch.undo()
+        OutboxEmail.objects.update(send_after=timezone.now())
+        call_command('send_outbox', verbosity=0)
+        assert len(mail.outbox) == 2
+
+    def test_gives_up_after_max_attempts(self, guest_client):
+        signup(guest_client)
+        OutboxEmail.objects.update(attempts=5)
+        call_command('send_outbox', max_attempts=5, verbosity=0)
+        assert mail.outbox == []
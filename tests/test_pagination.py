@@ -0,0 +1,58 @@
+import pytest
+from reviews.models import Review, Title
+
+
+@pytest.fixture
+def many_reviews(title, django_user_model):
+    for number in range(23):
+        author = django_user_model.objects.create(
+            username=f'author{number}', email=f'author{number}@yamdb.fake'
+        )
+        Review.objects.create(title=title, author=author, text='Отзыв',
+                              score=5)
+    return list(title.reviews.order_by('-pub_date', '-id')
+                .values_list('id', flat=True))
+
+
+def walk(client, url):
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data, (
+            'Курсорная пагинация не должна считать COUNT(*)'
+        )
+        ids.extend(item['id'] for item in data['results'])
+        url = data['next']
+    return ids
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    def test_reviews_cursor_walk(self, guest_client, title, many_reviews):
+        ids = walk(guest_client, f'/api/v1/titles/{title.id}/reviews/?cursor=')
+        assert ids == many_reviews
+
+    def test_reviews_legacy_pages(self, guest_client, title, many_reviews):
+        response = guest_client.get(
+            f'/api/v1/titles/{title.id}/reviews/?page=2'
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data['count'] == len(many_reviews)
+        assert [item['id'] for item in data['results']] == many_reviews[10:20]
+
+    def test_titles_cursor_walk(self, guest_client, category):
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {number}', year=2000)
+            for number in range(25)
+        )
+        ids = walk(guest_client, '/api/v1/titles/?cursor=')
+        assert ids == list(Title.objects.values_list('id', flat=True))
+
+    def test_invalid_cursor(self, guest_client):
+        response = guest_client.get('/api/v1/titles/?cursor=broken')
+        assert response.status_code == 404
+
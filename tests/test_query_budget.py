@@ -0,0 +1,176 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Comment, Review, Title
+
+# Бюджеты сняты на PostgreSQL: на SQLite, например, поисковый индекс
+# обновляется отдельными запросами.
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Число запросов зафиксировано для PostgreSQL',
+)
+
+# (клиент, метод, адрес, данные, код ответа, число запросов)
+# Здесь все адреса api/urls.py, кроме двух, которые проверяются отдельно:
+# выгрузка /titles/export/ отдаёт потоковый ответ и читает базу при его
+# чтении (test_titles_export_query_budget), а /auth/token/refresh/ нужен
+# выданный токен, обновление проверено без запросов к базе в
+# test_authentication.py::test_refresh_without_queries.
+ENDPOINTS = (
+    ('guest_client', 'get', '/api/v1/titles/', None, 200, 3),
+    ('guest_client', 'get', '/api/v1/titles/?cursor=', None, 200, 2),
+    ('guest_client', 'get', '/api/v1/titles/?ordering=-rating', None, 200, 3),
+    ('guest_client', 'get', '/api/v1/titles/{title}/', None, 200, 2),
+    ('guest_client', 'get', '/api/v1/titles/{title}/?include=reviews',
+     None, 200, 3),
+    ('guest_client', 'get', '/api/v1/titles/?id__in={title},999999',
+     None, 200, 2),
+    ('admin_client', 'post', '/api/v1/titles/',
+     {'name': 'Новое', 'year': 2000, 'category': 'films',
+      'genre': ['genre-0', 'genre-1']}, 201, 9),
+    ('admin_client', 'patch', '/api/v1/titles/{title}/',
+     {'name': 'Другое'}, 200, 5),
+    ('admin_client', 'delete', '/api/v1/titles/{title}/', None, 204, 19),
+    ('admin_client', 'post', '/api/v1/titles/bulk/',
+     [{'name': f'Новое {number}', 'year': 2000, 'category': 'films',
+       'genre': ['genre-0', 'genre-1']} for number in range(10)], 201, 8),
+    ('guest_client', 'get', '/api/v1/categories/', None, 200, 2),
+    ('admin_client', 'post', '/api/v1/categories/',
+     {'name': 'Книги', 'slug': 'books'}, 201, 4),
+    ('admin_client', 'delete', '/api/v1/categories/films/', None, 204, 6),
+    ('admin_client', 'post', '/api/v1/categories/bulk/',
+     [{'name': f'Новая категория {number}', 'slug': f'bulk-{number}'}
+      for number in range(10)], 201, 5),
+    ('guest_client', 'get', '/api/v1/genres/', None, 200, 2),
+    ('guest_client', 'get', '/api/v1/genres/genre-0/stats/', None, 200, 2),
+    ('guest_client', 'get', '/api/v1/categories/films/stats/',
+     None, 200, 2),
+    ('admin_client', 'get', '/api/v1/changes/', None, 200, 1),
+    ('guest_client', 'get', '/api/v1/leaderboard/', None, 200, 2),
+    ('guest_client', 'get', '/api/v1/leaderboard/?genre=genre-0&limit=3',
+     None, 200, 2),
+    ('guest_client', 'get', '/api/v1/leaderboard/?category=films',
+     None, 200, 2),
+    ('admin_client', 'post', '/api/v1/genres/',
+     {'name': 'Новый', 'slug': 'new'}, 201, 4),
+    ('admin_client', 'delete', '/api/v1/genres/genre-2/', None, 204, 5),
+    ('admin_client', 'post', '/api/v1/genres/bulk/',
+     [{'name': f'Новый жанр {number}', 'slug': f'bulk-{number}'}
+      for number in range(10)], 201, 5),
+    ('guest_client', 'get', '/api/v1/titles/{title}/reviews/', None, 200, 3),
+    ('guest_client', 'get', '/api/v1/titles/{title}/reviews/?cursor=',
+     None, 200, 2),
+    ('guest_client', 'get', '/api/v1/titles/{title}/reviews/{review}/',
+     None, 200, 1),
+    ('guest_client', 'get',
+     '/api/v1/titles/{title}/reviews/?id__in={review},999999', None, 200, 2),
+    ('moderator_client', 'post', '/api/v1/titles/{title}/reviews/',
+     {'text': 'Отзыв', 'score': 5}, 201, 7),
+    ('moderator_client', 'patch', '/api/v1/titles/{title}/reviews/{review}/',
+     {'score': 9}, 200, 5),
+    ('moderator_client', 'delete',
+     '/api/v1/titles/{title}/reviews/{review}/', None, 204, 9),
+    ('guest_client', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/comments/', None, 200, 3),
+    ('guest_client', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/comments/?cursor=',
+     None, 200, 2),
+    ('guest_client', 'get',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/',
+     None, 200, 1),
+    ('moderator_client', 'post',
+     '/api/v1/titles/{title}/reviews/{review}/comments/',
+     {'text': 'Комментарий'}, 201, 3),
+    ('moderator_client', 'patch',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/',
+     {'text': 'Другой'}, 200, 3),
+    ('moderator_client', 'delete',
+     '/api/v1/titles/{title}/reviews/{review}/comments/{comment}/',
+     None, 204, 3),
+    ('admin_client', 'get', '/api/v1/users/', None, 200, 2),
+    ('admin_client', 'get', '/api/v1/users/?cursor=', None, 200, 1),
+    ('admin_client', 'post', '/api/v1/users/',
+     {'username': 'newbie', 'email': 'newbie@yamdb.fake'}, 201, 3),
+    ('admin_client', 'get', '/api/v1/users/TestUser/', None, 200, 1),
+    ('admin_client', 'patch', '/api/v1/users/TestUser/',
+     {'bio': 'bio'}, 200, 2),
+    ('admin_client', 'delete', '/api/v1/users/TestUser/', None, 204, 15),
+    ('user_client', 'get', '/api/v1/users/me/', None, 200, 1),
+    ('user_client', 'patch', '/api/v1/users/me/', {'bio': 'bio'}, 200, 2),
+    ('guest_client', 'post', '/api/v1/auth/signup/',
+     {'username': 'newbie', 'email': 'newbie@yamdb.fake'}, 200, 9),
+    ('guest_client', 'post', '/api/v1/auth/token/',
+     {'username': 'TestUser', 'confirmation_code': 'wrong'}, 400, 1),
+)
+
+
+@pytest.fixture
+def catalogue(title, review, comment, category, genres, another_user):
+    """Несколько произведений, отзывов и комментариев на каждой странице."""
+    for number in range(4):
+        other = Title.objects.create(name=f'Произведение {number}',
+                                     year=2000, category=category)
+        other.genre.set(genres)
+        Review.objects.create(title=other, author=another_user,
+                              text='Отзыв', score=number + 1)
+    Review.objects.create(title=title, author=another_user,
+                          text='Отзыв', score=3)
+    return {'title': title.id, 'review': review.id, 'comment': comment.id}
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+
+    @pytest.mark.parametrize(
+        'client_name, method, url, data, status_code, queries', ENDPOINTS
+    )
+    def test_endpoint_query_budget(self, request, catalogue, client_name,
+                                   method, url, data, status_code, queries):
+        client = request.getfixturevalue(client_name)
+        url = url.format(**catalogue)
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, data=data, format='json')
+        assert response.status_code == status_code, (
+            f'{method.upper()} {url} вернул {response.status_code}'
+        )
+        assert len(context.captured_queries) == queries, (
+            f'{method.upper()} {url} выполнил '
+            f'{len(context.captured_queries)} запросов вместо {queries}:\n'
+            + '\n'.join(query['sql'] for query in context.captured_queries)
+        )
+
+    @pytest.mark.parametrize('format', ('ndjson', 'csv'))
+    def test_titles_export_query_budget(self, admin_client, catalogue,
+                                        format):
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(
+                f'/api/v1/titles/export/?format={format}'
+            )
+            lines = b''.join(response.streaming_content).splitlines()
+        assert response.status_code == 200
+        assert len(lines) >= 5
+        # Произведения и их жанры читаются двумя курсорами.
+        assert len(context.captured_queries) == 2, '\n'.join(
+            query['sql'] for query in context.captured_queries
+        )
+
+    @pytest.mark.parametrize('limit', (1, 5, 50))
+    def test_titles_list_does_not_depend_on_page_size(
+        self, guest_client, catalogue, django_assert_num_queries, limit
+    ):
+        with django_assert_num_queries(3):
+            response = guest_client.get(f'/api/v1/titles/?limit={limit}')
+        assert response.status_code == 200
+        assert len(response.json()['results']) == min(limit, 5)
+
+    def test_comments_page_does_not_depend_on_page_size(
+        self, guest_client, review, user, django_assert_num_queries
+    ):
+        for number in range(50):
+            Comment.objects.create(review=review, author=user,
+                                   text=f'Комментарий {number}')
+        url = (f'/api/v1/titles/{review.title_id}/reviews/{review.id}'
+               '/comments/?cursor=')
+        with django_assert_num_queries(2):
+            response = guest_client.get(url)
+        assert len(response.json()['results']) == 10
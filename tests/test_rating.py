@@ -0,0 +1,72 @@
+import pytest
+from django.db import IntegrityError
+from reviews.models import Review, Title
+
+
+def assert_rating(title, score_sum, reviews_count, rating):
+    title = Title.objects.get(pk=title.pk)
+    assert (title.score_sum, title.reviews_count, title.rating) == (
+        score_sum, reviews_count, rating
+    ), 'Проверьте, что рейтинг произведения пересчитывается при записи отзыва'
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_rating_follows_review_writes(self, title, user, another_user):
+        assert_rating(title, 0, 0, None)
+        review = Review.objects.create(title=title, author=user,
+                                       text='a', score=7)
+        Review.objects.create(title=title, author=another_user,
+                              text='b', score=10)
+        assert_rating(title, 17, 2, 8)
+
+        review.score = 2
+        review.save()
+        assert_rating(title, 12, 2, 6)
+        review.text = 'c'
+        review.save()
+        assert_rating(title, 12, 2, 6)
+
+        review.delete()
+        assert_rating(title, 10, 1, 10)
+
+    def test_rating_after_cascade_delete(self, title, user, another_user):
+        Review.objects.create(title=title, author=user, text='a', score=3)
+        Review.objects.create(title=title, author=another_user,
+                              text='b', score=5)
+        another_user.delete()
+        assert_rating(title, 3, 1, 3)
+        user.delete()
+        assert_rating(title, 0, 0, None)
+
+    def test_refresh_ratings(self, title, review):
+        Review.objects.update(score=1)
+        Title.objects.refresh_ratings()
+        assert_rating(title, 1, 1, 1)
+
+    def test_titles_rating_from_api(self, guest_client, title, review):
+        response = guest_client.get(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 200
+        assert response.json()['rating'] == review.score
+        assert 'score_sum' not in response.json()
+
+    def test_duplicate_review_keeps_rating(self, user_client, title, review):
+        response = user_client.post(
+            f'/api/v1/titles/{title.id}/reviews/',
+            data={'text': 'Ещё раз', 'score': 1},
+        )
+        assert response.status_code == 400
+        assert response.json() == {'non_field_errors': ['Отзыв уже оставлен']}
+        assert_rating(title, review.score, 1, review.score)
+
+    def test_other_integrity_errors_are_not_duplicates(
+        self, user_client, title, monkeypatch
+    ):
+        def violate(*args, **kwargs):
+            raise IntegrityError('violates foreign key constraint')
+
+        monkeypatch.setattr(Review, 'save', violate)
+        with pytest.raises(IntegrityError):
+            user_client.post(f'/api/v1/titles/{title.id}/reviews/',
+                             data={'text': 'Отзыв', 'score': 1})
@@ -0,0 +1,77 @@
+import io
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from api.renderers import FastJSONParser, FastJSONRenderer
+from django.core.management import call_command
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+
+class TestFastJSON:
+
+    @pytest.mark.parametrize('data', (
+        {'name': 'Чудо юдо', 'genre': [], 'rating': None, 'ok': True},
+        {'text': 'строка \u2028 и \u2029 разделители'},
+        [datetime(2023, 5, 1, 12, 30, 1, 123456, tzinfo=timezone.utc),
+         datetime(2023, 5, 1, 12, 30), date(2023, 5, 1), time(8, 15, 3, 5),
+         datetime(2023, 5, 1, tzinfo=timezone(timedelta(hours=3)))],
+        {'price': Decimal('10.50'), 'id': uuid.UUID(int=1),
+         'duration': timedelta(minutes=2), 'label': gettext_lazy('Name')},
+        {'big': 2 ** 70},
+        {1: 'нестроковый ключ'},
+        ('кортеж', 1.5, -0.0),
+    ))
+    def test_same_output(self, data):
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_indent_and_none(self):
+        data = {'name': 'Фильм'}
+        for media_type in ('application/json; indent=4', None):
+            assert FastJSONRenderer().render(
+                data, media_type, {'indent': 2}
+            ) == JSONRenderer().render(data, media_type, {'indent': 2})
+        assert FastJSONRenderer().render(None) == b''
+
+    def test_unsupported_type(self):
+        with pytest.raises(TypeError):
+            FastJSONRenderer().render({'value': object()})
+
+    @pytest.mark.parametrize('body', (
+        b'{"name": "\xd0\xa4\xd0\xb8\xd0\xbb\xd1\x8c\xd0\xbc", "score": 7}',
+        b'[1, 2.5, null, {"big": 123456789012345678901234567890}]',
+    ))
+    def test_parse(self, body):
+        assert (FastJSONParser().parse(io.BytesIO(body))
+                == JSONParser().parse(io.BytesIO(body)))
+
+    @pytest.mark.parametrize('body', (b'{"score": NaN}', b'{"score":', b''))
+    def test_parse_error(self, body):
+        with pytest.raises(ParseError) as fast:
+            FastJSONParser().parse(io.BytesIO(body))
+        with pytest.raises(ParseError) as default:
+            JSONParser().parse(io.BytesIO(body))
+        assert str(fast.value) == str(default.value)
+
+    def test_benchmark_command(self):
+        stdout = io.StringIO()
+        call_command('bench_json', size=3, number=1, stdout=stdout)
+        assert 'titles render' in stdout.getvalue()
+        assert 'reviews parse' in stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestFastJSONApi:
+
+    def test_api_uses_fast_json(self, admin_client, category):
+        response = admin_client.post(
+            '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'},
+            format='json'
+        )
+        assert response.status_code == 201
+        assert isinstance(response.accepted_renderer, FastJSONRenderer)
+        assert response.content == JSONRenderer().render(response.data)
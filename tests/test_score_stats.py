@@ -0,0 +1,90 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Review, Title
+
+
+def get_scores(**counts):
+    scores = {str(score): 0 for score in range(1, 11)}
+    scores.update(counts)
+    return scores
+
+
+@pytest.fixture
+def reviewed(title, genres, category, user, another_user):
+    """Произведение с оценками 9 и 7 и второе, только жанра genre-2."""
+    second = Title.objects.create(name='Второе', year=2000)
+    second.genre.set(genres[2:])
+    Review.objects.create(title=title, author=user, text='.', score=9)
+    Review.objects.create(title=title, author=another_user, text='.',
+                          score=7)
+    Review.objects.create(title=second, author=user, text='.', score=2)
+    return second
+
+
+@pytest.mark.django_db
+class TestScoreStats:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_histogram_follows_reviews(self, guest_client, title, reviewed,
+                                       user):
+        url = f'/api/v1/titles/{title.id}/'
+        assert guest_client.get(url).json()['scores'] == get_scores(
+            **{'7': 1, '9': 1}
+        )
+        review = title.reviews.get(author=user)
+        review.score = 1
+        review.save()
+        assert guest_client.get(url).json()['scores'] == get_scores(
+            **{'1': 1, '7': 1}
+        )
+        review.delete()
+        assert guest_client.get(url).json()['scores'] == get_scores(
+            **{'7': 1}
+        )
+
+    def test_refresh_ratings(self, title, reviewed):
+        Title.objects.update(score_7=0, score_9=5)
+        Title.objects.refresh_ratings()
+        title.refresh_from_db()
+        assert (title.score_7, title.score_9) == (1, 1)
+
+    def test_histogram_not_in_list(self, guest_client, reviewed):
+        response = guest_client.get('/api/v1/titles/')
+        assert 'scores' not in response.json()['results'][0]
+        assert 'score_7' not in response.json()['results'][0]
+
+    @pytest.mark.parametrize('url,expected', (
+        ('/api/v1/genres/genre-0/stats/',
+         {'titles_count': 1, 'reviews_count': 2, 'rating': 8,
+          'scores': get_scores(**{'7': 1, '9': 1})}),
+        ('/api/v1/genres/genre-2/stats/',
+         {'titles_count': 1, 'reviews_count': 1, 'rating': 2,
+          'scores': get_scores(**{'2': 1})}),
+        ('/api/v1/categories/films/stats/',
+         {'titles_count': 1, 'reviews_count': 2, 'rating': 8,
+          'scores': get_scores(**{'7': 1, '9': 1})}),
+    ))
+    def test_stats(self, guest_client, reviewed, url, expected):
+        with CaptureQueriesContext(connection) as context:
+            response = guest_client.get(url)
+        assert response.status_code == 200
+        assert response.json() == expected
+        assert 'reviews_review' not in ' '.join(
+            query['sql'] for query in context.captured_queries
+        ), 'Проверьте, что сводка не читает таблицу отзывов'
+
+    def test_stats_empty_and_unknown(self, guest_client, genres):
+        response = guest_client.get('/api/v1/genres/genre-1/stats/')
+        assert response.json() == {'titles_count': 0, 'reviews_count': 0,
+                                   'rating': None, 'scores': get_scores()}
+        response = guest_client.get('/api/v1/genres/unknown/stats/')
+        assert response.status_code == 404
+
+    def test_score_range(self, user_client, title):
+        for score in (0, 11):
+            response = user_client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                data={'text': 'Отзыв', 'score': score},
+            )
+            assert response.status_code == 400
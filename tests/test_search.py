@@ -0,0 +1,50 @@
+import pytest
+from reviews.models import Title
+
+
+@pytest.fixture
+def catalogue(category):
+    return {
+        'war': Title.objects.create(
+            name='Война и мир', year=1869, category=category,
+            description='Роман-эпопея о войне 1812 года'
+        ),
+        'peace': Title.objects.create(
+            name='Тихий Дон', year=1940, category=category,
+            description='Казаки, война и мирная жизнь'
+        ),
+        'other': Title.objects.create(
+            name='Мастер и Маргарита', year=1967, category=category
+        ),
+    }
+
+
+def search(client, text):
+    response = client.get('/api/v1/titles/', {'search': text})
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_name_ranks_above_description(self, guest_client, catalogue):
+        assert search(guest_client, 'война') == ['Война и мир', 'Тихий Дон']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_follows_updates(self, guest_client, catalogue):
+        title = catalogue['other']
+        title.description = 'Воланд и война в Москве'
+        title.save()
+        assert 'Мастер и Маргарита' in search(guest_client, 'война')
+        catalogue['war'].delete()
+        assert 'Война и мир' not in search(guest_client, 'война')
+
+    def test_special_characters(self, guest_client, catalogue):
+        assert search(guest_client, '"Маргарита') == ['Мастер и Маргарита']
+        assert search(guest_client, 'нетакогослова') == []
+
+    def test_search_keeps_query_budget(self, guest_client, catalogue,
+                                       django_assert_num_queries):
+        with django_assert_num_queries(3):
+            search(guest_client, 'война')
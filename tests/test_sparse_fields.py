@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def get_sql(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.json(), ' '.join(
+        query['sql'] for query in context.captured_queries
+    )
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def test_title_fields(self, guest_client, title):
+        data, sql = get_sql(guest_client, '/api/v1/titles/?fields=id,name')
+        assert data['results'] == [{'id': title.id, 'name': title.name}]
+        assert 'reviews_genre' not in sql, (
+            'Проверьте, что жанры не загружаются, если их не запросили'
+        )
+        assert 'reviews_category' not in sql
+        assert '"description"' not in sql
+        assert '"rating"' not in sql
+
+    def test_title_expand(self, guest_client, title):
+        data, _ = get_sql(guest_client,
+                          f'/api/v1/titles/{title.id}/?expand=')
+        assert data['category'] == 'films'
+        assert data['genre'] == ['genre-0', 'genre-1']
+        data, _ = get_sql(guest_client,
+                          f'/api/v1/titles/{title.id}/?expand=genre')
+        assert data['category'] == 'films'
+        assert data['genre'][0] == {'name': 'Жанр 0', 'slug': 'genre-0'}
+
+    def test_default_unchanged(self, guest_client, title):
+        data, _ = get_sql(guest_client, f'/api/v1/titles/{title.id}/')
+        assert list(data) == ['id', 'category', 'genre', 'rating', 'year',
+                              'name', 'description', 'scores']
+        assert data['category'] == {'name': 'Фильм', 'slug': 'films'}
+
+    @pytest.mark.parametrize('query', ('fields=id,nope', 'expand=rating'))
+    def test_unknown_names(self, guest_client, title, query):
+        response = guest_client.get(f'/api/v1/titles/?{query}')
+        assert response.status_code == 400
+
+    def test_review_fields_with_cursor(self, guest_client, title, review):
+        data, sql = get_sql(
+            guest_client,
+            f'/api/v1/titles/{title.id}/reviews/?cursor=&fields=id,score'
+        )
+        assert data['results'] == [{'id': review.id, 'score': review.score}]
+        assert 'reviews_user' not in sql
+        assert '"text"' not in sql
+
+    def test_comment_fields(self, guest_client, comment):
+        review = comment.review
+        data, _ = get_sql(
+            guest_client,
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/comments/'
+            f'{comment.id}/?fields=author'
+        )
+        assert data == {'author': comment.author.username}
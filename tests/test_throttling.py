@@ -0,0 +1,120 @@
+import logging
+from io import StringIO
+
+import pytest
+from api.throttling import TokenBucketThrottle, get_rejected
+from django.core.management import call_command
+
+
+def get_token(client, username):
+    return client.post('/api/v1/auth/token/', data={
+        'username': username, 'confirmation_code': 'wrong',
+    })
+
+
+@pytest.fixture
+def rates(settings):
+    def set_rates(**rates):
+        settings.API_THROTTLE = {'RATES': rates}
+    return set_rates
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(TokenBucketThrottle, 'timer', lambda self: now[0])
+    return now
+
+
+@pytest.mark.django_db
+class TestTokenBucketThrottle:
+
+    def test_username_bucket(self, guest_client, user, rates, clock):
+        rates(token={'username': '2/min'})
+        assert get_token(guest_client, 'TestUser').status_code == 400
+        assert get_token(guest_client, 'TestUser').status_code == 400
+        response = get_token(guest_client, 'TestUser')
+        assert response.status_code == 429
+        assert response['Retry-After'] == '30'
+        assert get_token(guest_client, 'Other').status_code == 404, (
+            'Корзина должна быть своя у каждого username'
+        )
+        assert get_rejected('token') == {'ip': 0, 'username': 1}
+
+    def test_rejections_logged_once_per_interval(self, guest_client, user,
+                                                 rates, clock, caplog):
+        rates(token={'username': '1/min'})
+        with caplog.at_level(logging.WARNING, logger='api.throttling'):
+            for _ in range(5):
+                get_token(guest_client, 'TestUser')
+        assert [record.getMessage() for record in caplog.records
+                if record.name == 'api.throttling'] == [
+            'Превышена частота запросов: token, username, всего отказов 1'
+        ]
+        assert get_rejected('token') == {'ip': 0, 'username': 4}
+
+        stdout = StringIO()
+        call_command('throttle_stats', stdout=stdout)
+        assert stdout.getvalue() == 'token: ip 0, username 4\n'
+
+    def test_bucket_refills(self, guest_client, user, rates, clock):
+        rates(token={'username': '2/min'})
+        get_token(guest_client, 'TestUser')
+        get_token(guest_client, 'TestUser')
+        clock[0] += 29
+        assert get_token(guest_client, 'TestUser').status_code == 429
+        clock[0] += 1
+        assert get_token(guest_client, 'TestUser').status_code == 400
+        assert get_token(guest_client, 'TestUser').status_code == 429
+        clock[0] += 60
+        assert get_token(guest_client, 'TestUser').status_code == 400
+        assert get_token(guest_client, 'TestUser').status_code == 400
+
+    def test_ip_bucket(self, guest_client, rates, clock):
+        rates(signup={'ip': '1/hour'})
+        response = guest_client.post('/api/v1/auth/signup/', data={
+            'username': 'first', 'email': 'first@yamdb.fake',
+        })
+        assert response.status_code == 200
+        response = guest_client.post('/api/v1/auth/signup/', data={
+            'username': 'second', 'email': 'second@yamdb.fake',
+        })
+        assert response.status_code == 429
+        assert response['Retry-After'] == '3600'
+
+    def test_spoofed_forwarded_for_shares_bucket(self, guest_client, rates,
+                                                 clock):
+        rates(signup={'ip': '1/hour'})
+        # nginx ставит последним адресом настоящий адрес клиента, а то,
+        # что клиент прислал сам, стоит раньше и не учитывается.
+        statuses = [
+            guest_client.post('/api/v1/auth/signup/', data={
+                'username': f'user{number}',
+                'email': f'user{number}@yamdb.fake',
+            }, HTTP_X_FORWARDED_FOR=f'10.0.0.{number}, 192.0.2.1').status_code
+            for number in range(3)
+        ]
+        assert statuses == [200, 429, 429]
+        response = guest_client.post('/api/v1/auth/signup/', data={
+            'username': 'other', 'email': 'other@yamdb.fake',
+        }, HTTP_X_FORWARDED_FOR='192.0.2.2')
+        assert response.status_code == 200, (
+            'Корзина должна быть своя у каждого адреса клиента'
+        )
+
+    def test_only_review_creation_throttled(self, user_client, title,
+                                            rates, clock):
+        rates(reviews={'username': '1/min'})
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(url, data={'text': 'a', 'score': 5})
+        assert response.status_code == 201
+        assert user_client.post(
+            url, data={'text': 'b', 'score': 5}
+        ).status_code == 429
+        assert user_client.get(url).status_code == 200
+        assert user_client.get(url).status_code == 200
+
+    def test_without_rates(self, guest_client, user, rates):
+        rates()
+        for _ in range(20):
+            assert get_token(guest_client, 'TestUser').status_code == 400
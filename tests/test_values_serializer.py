@@ -0,0 +1,59 @@
+import pytest
+from api.views import CategoryViewSet, GenreViewSet, TitleViewSet
+from django.core.cache import cache
+
+
+@pytest.fixture
+def catalogue(title, review, genres):
+    from reviews.models import Title
+
+    other = Title.objects.create(name='Без категории', year=1990,
+                                 description='Описание')
+    # Жанры в ответе идут по id, а не в порядке добавления.
+    other.genre.set([genres[2], genres[0]])
+    Title.objects.create(name='Без жанров', year=2000)
+
+
+@pytest.mark.django_db
+class TestValuesSerializer:
+
+    @pytest.mark.parametrize('viewset,url', (
+        (TitleViewSet, '/api/v1/titles/'),
+        (TitleViewSet, '/api/v1/titles/?limit=2&offset=1'),
+        (TitleViewSet, '/api/v1/titles/?cursor='),
+        (TitleViewSet, '/api/v1/titles/?genre=genre-0'),
+        (TitleViewSet, '/api/v1/titles/?genre__contains=genre'),
+        (TitleViewSet, '/api/v1/titles/?year=3000'),
+        (GenreViewSet, '/api/v1/genres/'),
+        (GenreViewSet, '/api/v1/genres/?search=Жанр'),
+        (CategoryViewSet, '/api/v1/categories/'),
+    ))
+    def test_same_bytes(self, monkeypatch, guest_client, catalogue,
+                        viewset, url):
+        fast = guest_client.get(url)
+        assert fast.status_code == 200
+        monkeypatch.setattr(viewset, 'values_serializer_class', None)
+        # Обычный путь не должен прийти из кэша быстрого.
+        cache.clear()
+        slow = guest_client.get(url)
+        assert fast.content == slow.content, (
+            'Проверьте, что values_serializer_class отдаёт те же байты, '
+            'что и обычный сериализатор'
+        )
+
+    def test_no_model_instances(self, monkeypatch, guest_client, catalogue):
+        from reviews.models import Title
+
+        def fail(*args, **kwargs):
+            raise AssertionError('Объект модели создан в list')
+
+        monkeypatch.setattr(Title, 'from_db', classmethod(fail))
+        assert guest_client.get('/api/v1/titles/').status_code == 200
+
+    def test_sparse_fields_use_serializer(self, guest_client, title):
+        response = guest_client.get('/api/v1/titles/?fields=id,genre')
+        assert response.json()['results'] == [{
+            'id': title.id,
+            'genre': [{'name': 'Жанр 0', 'slug': 'genre-0'},
+                      {'name': 'Жанр 1', 'slug': 'genre-1'}],
+        }]